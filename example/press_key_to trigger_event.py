@@ -1,11 +1,38 @@
-import msvcrt # NOTE: this module is windows only! Required to detect keypress.
-import time
 import sys
 import argparse
 
 from pythonosc import osc_message_builder
 from pythonosc import udp_client
 
+try:
+    import msvcrt  # Windows
+
+    def read_key():
+        """Block until a key is pressed and return it"""
+        char = msvcrt.getwch()
+        if char == '\x03':
+            raise KeyboardInterrupt
+        return char
+
+except ImportError:
+    import termios  # POSIX
+    import tty
+
+    def read_key():
+        """Block until a key is pressed and return it; returns '' at the end of piped input"""
+        fd = sys.stdin.fileno()
+        try:
+            old_settings = termios.tcgetattr(fd)
+        except termios.error:
+            # stdin is not a terminal, e.g. piped input
+            return sys.stdin.read(1)
+        try:
+            # cbreak: return single keys without waiting for enter, ctrl+c still works
+            tty.setcbreak(fd)
+            return sys.stdin.read(1)
+        finally:
+            termios.tcsetattr(fd, termios.TCSADRAIN, old_settings)
+
 # Define default and static values
 osc_identifier1 = '/pyBinSimSoundevent'
 ip = '127.0.0.1'
@@ -20,30 +47,29 @@ args = parser.parse_args()
 # Create OSC client
 client = udp_client.SimpleUDPClient(args.ip, args.port)
 print("OSC client is running.")
-print("Waiting for button press...\n\tq - start event 004 on channel 0\n\tq - start event 002 on channel 1")
+print("Waiting for button press...\n\tq - start event 004 on channel 0\n\tw - start event 002 on channel 1\n\te - pause event 002")
 try:
     while 1:
 
-        if msvcrt.kbhit():
-            char = msvcrt.getch()
-            #print("Pressed Button:{} ({})".format(char, ord(char)))
-	
-            if ord(char) == 113: #q
-                print('char ',char)
-                message = ['004', 'start', 0]
-                client.send_message(osc_identifier1, message) 
-            
-            if ord(char) == 119: #w
-                message = ['002', 'start', 1]
-                client.send_message(osc_identifier1, message) 
-
-            if ord(char) == 101: #e
-                message = ['002', 'pause']
-                client.send_message(osc_identifier1, message) 
-        
-        sys.stdout.flush()
-        time.sleep(0.1)        
-
-except KeyboardInterrupt:	
+        # blocks until the next key press, no polling
+        char = read_key()
+        if char == '':
+            break
+        #print("Pressed Button:{} ({})".format(char, ord(char)))
+
+        if char == 'q':
+            print('char ',char)
+            message = ['004', 'start', 0]
+            client.send_message(osc_identifier1, message)
+
+        if char == 'w':
+            message = ['002', 'start', 1]
+            client.send_message(osc_identifier1, message)
+
+        if char == 'e':
+            message = ['002', 'pause']
+            client.send_message(osc_identifier1, message)
+
+except KeyboardInterrupt:
     """Break if ctrl+c is pressed"""
     print("Exit by Keyboard interrupt.")
@@ -25,12 +25,12 @@ import logging
 import time
 import numpy as np
 import pyaudio
+from numba import njit
 
-from pybinsim.convolver import ConvolverFFTW
+from pybinsim.convolver import ConvolverFFTW, MultiConvolverFFTW, MultiConvolverCuFFT
 from pybinsim.filterstorage import FilterStorage
 from pybinsim.osc_receiver import OscReceiver
-from pybinsim.pose import Pose
-from pybinsim.soundhandler import SoundHandler
+from pybinsim.render_thread import RenderThread
 from pybinsim.soundhandling import AudioBuffer, SoundSceneHandler
 
 
@@ -48,8 +48,60 @@ def parse_boolean(any_value):
     return None
 
 
+@njit(cache=True, fastmath=True)
+def finalize(result, left, right, scale):
+    """
+    Write the scaled left and right signals into the stereo result block in a single pass
+
+    :param result: Output block [blockSize, 2], written in place
+    :param left: Left ear signal
+    :param right: Right ear signal
+    :param scale: Gain applied to both ears
+    :return: Peak absolute value of the result
+    """
+    peak = 0.0
+    for i in range(result.shape[0]):
+        value_left = left[i] * scale
+        value_right = right[i] * scale
+        result[i, 0] = value_left
+        result[i, 1] = value_right
+        peak = max(peak, abs(value_left), abs(value_right))
+
+    return peak
+
+
+@njit(cache=True, fastmath=True)
+def peak(result):
+    """
+    Peak absolute value of a block, computed in one pass without temporary arrays
+
+    :param result: Output block [blockSize, 2]
+    :return: Peak absolute value
+    """
+    value = 0.0
+    for i in range(result.shape[0]):
+        for j in range(result.shape[1]):
+            value = max(value, abs(result[i, j]))
+
+    return value
+
 
 class BinSimConfig(object):
+
+    # Parser for the values of each configuration entry
+    _CONVERTERS = {'soundfile': str,
+                   'blockSize': int,
+                   'filterSize': int,
+                   'filterList': str,
+                   'enableCrossfading': parse_boolean,
+                   'useHeadphoneFilter': parse_boolean,
+                   'loudnessFactor': float,
+                   'maxChannels': int,
+                   'samplingRate': int,
+                   'loopSound': parse_boolean,
+                   'device': str,
+                   'renderAhead': int}
+
     def __init__(self):
 
         self.log = logging.getLogger("pybinsim.BinSimConfig")
@@ -64,33 +116,35 @@ class BinSimConfig(object):
                                   'loudnessFactor': float(1),
                                   'maxChannels': 8,
                                   'samplingRate': 44100,
-                                  'loopSound': True}
+                                  'loopSound': True,
+                                  'device': 'cpu',
+                                  'renderAhead': 0}
 
     def read_from_file(self, filepath):
-        config = open(filepath, 'r')
-
-        for line in config:
-            line_content = str.split(line)
-            key = line_content[0]
-            value = line_content[1]
+        with open(filepath, 'r') as config:
+            for line in config:
+                line_content = line.split()
+                key = line_content[0]
+                value = line_content[1]
+
+                if key in self.configurationDict:
+                    self.configurationDict[key] = self._convert(key, value)
+                else:
+                    self.log.warning('Entry ' + key + ' is unknown')
 
-            if key in self.configurationDict:
-                config_value_type = type(self.configurationDict[key])
+    def _convert(self, key, value):
+        converter = self._CONVERTERS[key]
 
-                if config_value_type is bool:
-                    # evaluate 'False' to False
-                    boolean_config = parse_boolean(value)
+        if converter is parse_boolean:
+            # evaluate 'False' to False
+            boolean_config = parse_boolean(value)
 
-                    if boolean_config is None:
-                        self.log.warning("Cannot convert {} to bool. (key: {}".format(value, key))
+            if boolean_config is None:
+                self.log.warning("Cannot convert {} to bool. (key: {}".format(value, key))
 
-                    self.configurationDict[key] = boolean_config
-                else:
-                    # use type(str) - ctors of int, float, ...
-                    self.configurationDict[key] = config_value_type(value)
+            return boolean_config
 
-            else:
-                self.log.warning('Entry ' + key + ' is unknown')
+        return converter(value)
 
     def get(self, setting):
         return self.configurationDict[setting]
@@ -119,9 +173,10 @@ class BinSim(object):
         self.result = None
         self.block = None
         self.stream = None
+        self.renderThread = None
 
         self.convolverWorkers = []
-        self.convolverHP, self.convolvers, self.filterStorage, self.oscReceiver, self.sceneHandler, self.audioBuffer = self.initialize_pybinsim()
+        self.convolverHP, self.convolver, self.filterStorage, self.oscReceiver, self.sceneHandler, self.audioBuffer = self.initialize_pybinsim()
 
 
         self.p = pyaudio.PyAudio()
@@ -134,6 +189,12 @@ class BinSim(object):
 
     def stream_start(self):
         self.log.info("BinSim: stream_start")
+
+        # Optionally render blocks ahead of playback in a separate thread
+        if self.config.get('renderAhead') > 0:
+            self.renderThread = RenderThread(render_block(self), self.blockSize, self.config.get('renderAhead'))
+            self.renderThread.start()
+
         self.stream = self.p.open(format=pyaudio.paFloat32, channels=2,
                                   rate=self.sampleRate, output=True,
                                   frames_per_buffer=self.blockSize,
@@ -145,7 +206,12 @@ class BinSim(object):
 
     def initialize_pybinsim(self):
         self.result = np.empty([self.config.get('blockSize'), 2], np.dtype(np.float32))
-        self.block = np.empty([self.config.get('maxChannels'), self.config.get('blockSize')], np.dtype(np.float32))
+        self.block = np.zeros([self.config.get('maxChannels'), self.config.get('blockSize')], np.dtype(np.float32))
+
+        # Compile the output kernels now instead of in the first audio callback
+        silence = np.zeros(self.config.get('blockSize'), np.dtype(np.float32))
+        finalize(self.result, silence, silence, 1.0)
+        peak(self.result)
 
         # Create FilterStorage
         filterStorage = FilterStorage(self.config.get('filterSize'), self.config.get('blockSize'),
@@ -154,7 +220,8 @@ class BinSim(object):
         # Start an oscReceiver
         oscReceiver = OscReceiver()
         oscReceiver.start_listening()
-        time.sleep(1)
+        if not oscReceiver.ready.wait(timeout=2.0):
+            self.log.warning("oscReceiver did not start serving in time")
 
         # Create SoundHandler
         audioBuffer = AudioBuffer(self.config.get('blockSize'), self.config.get('maxChannels'))
@@ -164,11 +231,14 @@ class BinSim(object):
         soundfile_list = self.config.get('soundfile')
         sceneHandler.read_sound_files(soundfile_list)
 
-        # Create N convolvers depending on the number of wav channels
+        # Create one convolver for all channels depending on the number of wav channels
         self.log.info('Number of Channels: ' + str(self.config.get('maxChannels')))
-        convolvers = [None] * self.config.get('maxChannels')
-        for n in range(self.config.get('maxChannels')):
-            convolvers[n] = ConvolverFFTW(self.config.get('filterSize'), self.config.get('blockSize'), False)
+        if self.config.get('device') == 'cuda':
+            convolver = MultiConvolverCuFFT(self.config.get('filterSize'), self.config.get('blockSize'),
+                                            self.config.get('maxChannels'))
+        else:
+            convolver = MultiConvolverFFTW(self.config.get('filterSize'), self.config.get('blockSize'),
+                                           self.config.get('maxChannels'))
 
         # HP Equalization convolver
         convolverHP = None
@@ -177,7 +247,7 @@ class BinSim(object):
             hpfilter = filterStorage.get_headphone_filter()
             convolverHP.setIR(hpfilter, False)
 
-        return convolverHP, convolvers, filterStorage, oscReceiver, sceneHandler, audioBuffer
+        return convolverHP, convolver, filterStorage, oscReceiver, sceneHandler, audioBuffer
 
     def close(self):
         self.log.info("BinSim: close")
@@ -189,6 +259,9 @@ class BinSim(object):
         self.stream.stop_stream()
         self.stream.close()
 
+        if self.renderThread:
+            self.renderThread.close()
+
     def __cleanup(self):
         # Close everything when BinSim is finished
         self.filterStorage.close()
@@ -196,71 +269,78 @@ class BinSim(object):
 
         self.oscReceiver.close()
 
-        for n in range(self.config.get('maxChannels')):
-            self.convolvers[n].close()
+        self.convolver.close()
 
         if self.config.get('useHeadphoneFilter'):
             if self.convolverHP:
                 self.convolverHP.close()
 
 
-def audio_callback(binsim):
-    """ Wrapper for callback to hand over custom data """
+def render_block(binsim):
+    """ Wrapper for the rendering of one output block to hand over custom data """
     assert isinstance(binsim, BinSim)
 
-    # The pyAudio Callback
-    def callback(in_data, frame_count, time_info, status):
-        # print("pyAudio callback")
-
+    def render():
         # current_soundfile_list = binsim.oscReceiver.get_sound_file_list()
         # if current_soundfile_list:
         #     binsim.soundHandler.request_new_sound_file(current_soundfile_list)
 
-        if binsim.oscReceiver.new_soundevent_triggered():
+        while binsim.oscReceiver.new_soundevent_triggered():
             binsim.sceneHandler.control_sound_event(binsim.oscReceiver.get_soundevent_data())
 
         # Get sound block. At least one convolver should exist
         binsim.block[:binsim.audioBuffer.get_sound_channels(), :] = binsim.audioBuffer.buffer_read(binsim.sceneHandler.request_chunk())
 
-        # Update Filters and run each convolver with the current block
+        # Update Filters
         for n in range(binsim.audioBuffer.get_sound_channels()):
 
             # Get new Filter
             if binsim.oscReceiver.is_filter_update_necessary(n):
-                filterValueList = binsim.oscReceiver.get_current_values(n)
-                filter = binsim.filterStorage.get_filter(Pose.from_filterValueList(filterValueList))
-                binsim.convolvers[n].setIR(filter, callback.config.get('enableCrossfading'))
-
-            left, right = binsim.convolvers[n].process(binsim.block[n, :])
-            
-            # Sum results from all convolvers
-            if n == 0:
-                binsim.result[:, 0] = left
-                binsim.result[:, 1] = right
-            else:
-                binsim.result[:, 0] = np.add(binsim.result[:, 0],left)
-                binsim.result[:, 1] = np.add(binsim.result[:, 1],right)
-
-        # Finally apply Headphone Filter
-        if callback.config.get('useHeadphoneFilter'):
-            binsim.result[:, 0], binsim.result[:, 1] = binsim.convolverHP.process(binsim.result)
+                filter = binsim.filterStorage.get_filter_by_key(binsim.oscReceiver.get_current_key(n))
+                binsim.convolver.setIR(n, filter, render.config.get('enableCrossfading'))
+
+        # Run the convolver with the current blocks of all channels; results are already summed up
+        left, right = binsim.convolver.process(binsim.block)
 
-        # Scale data
-        binsim.result = np.divide(binsim.result, float((binsim.audioBuffer.get_sound_channels()) * 2))
-        binsim.result = np.multiply(binsim.result,callback.config.get('loudnessFactor'))
+        # Scale data and write it to the result block
+        scale = render.config.get('loudnessFactor') / float(binsim.audioBuffer.get_sound_channels() * 2)
+        result_peak = finalize(binsim.result, left, right, scale)
 
-        if np.max(np.abs(binsim.result))>1:
+        # Finally apply Headphone Filter (linear, so it can follow the scaling)
+        if render.config.get('useHeadphoneFilter'):
+            binsim.result[:, 0], binsim.result[:, 1] = binsim.convolverHP.process(binsim.result)
+            result_peak = peak(binsim.result)
+
+        if result_peak > 1:
             binsim.log.warn('Clipping occurred: Adjust loudnessFactor!')
 
-        # When the last block is smaller than the blockSize, this is probably the end of the file.
-        # Call pyaudio to stop after this frame
-        # Should not be the case for current soundhandler implementation
-        if binsim.block.size < callback.config.get('blockSize'):
-            pyaudio.paContinue = 1
+        return binsim.result
 
-        return (binsim.result[:frame_count].tostring(), pyaudio.paContinue)
+    render.config = binsim.config
 
-    callback.config = binsim.config
+    return render
 
-    return callback
 
+def audio_callback(binsim):
+    """ Wrapper for callback to hand over custom data """
+    assert isinstance(binsim, BinSim)
+
+    render = render_block(binsim)
+
+    # The pyAudio Callback
+    def callback(in_data, frame_count, time_info, status):
+        # print("pyAudio callback")
+
+        if binsim.renderThread:
+            data = binsim.renderThread.read_block(frame_count)
+            if data is None:
+                data = bytes(frame_count * 2 * 4)
+                if binsim.renderThread.error is not None:
+                    binsim.log.error('Rendering failed: stopping playback')
+                    return (data, pyaudio.paAbort)
+                binsim.log.warn('Buffer underrun: rendering is too slow')
+            return (data, pyaudio.paContinue)
+
+        return (render()[:frame_count].tostring(), pyaudio.paContinue)
+
+    return callback
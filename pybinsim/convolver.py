@@ -20,6 +20,8 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
+import atexit
+import functools
 import logging
 import multiprocessing
 import pickle
@@ -28,10 +30,114 @@ from timeit import default_timer
 
 import numpy as np
 import pyfftw
+from numba import njit, prange
 
 
 nThreads = multiprocessing.cpu_count()
 
+# File for the FFTW wisdom; it can be pointed elsewhere before the first convolver is created, None disables it
+fn_wisdom = Path(__file__).parent.parent / "tmp" / "fftw_wisdom.pickle"
+
+
+def load_wisdom():
+    """ Import FFTW plans saved by a previous pyBinSim session """
+    if fn_wisdom is not None and fn_wisdom.exists():
+        loaded_wisdom = pickle.load(open(fn_wisdom, 'rb'))
+        pyfftw.import_wisdom(loaded_wisdom)
+
+
+def save_wisdom():
+    """ Save FFTW plans to recover for next pyBinSim session """
+    if fn_wisdom is None:
+        return
+    collected_wisdom = pyfftw.export_wisdom()
+    try:
+        if not fn_wisdom.parent.exists():
+            fn_wisdom.parent.mkdir(parents=True)
+        with open(fn_wisdom, "wb") as wisdom_file:
+            pickle.dump(collected_wisdom, wisdom_file)
+    except OSError as e:
+        logging.getLogger("pybinsim.convolver").warning("Could not save FFTW wisdom to {}: {}".format(fn_wisdom, e))
+
+
+_wisdom_registered = False
+
+
+def use_wisdom():
+    """
+    Load the saved FFTW wisdom and register saving it on exit
+
+    FFTW keeps the wisdom in memory, so each plan size is only measured once per session.
+    This is done the first time a convolver builds its plans, not on import.
+    """
+    global _wisdom_registered
+    if _wisdom_registered:
+        return
+    _wisdom_registered = True
+    load_wisdom()
+    atexit.register(save_wisdom)
+
+
+@functools.lru_cache(maxsize=8)
+def _crossfade_windows(block_size):
+    """
+    COSINE-Square crossfade windows for one block size
+
+    :param block_size: Crossfade length in samples
+    :return: Read-only (crossFadeIn, crossFadeOut)
+    """
+    crossFadeOut = np.array(range(0, block_size), dtype='float32')
+    crossFadeOut = np.square(np.cos(crossFadeOut/(block_size-1)*(np.pi/2)))
+    crossFadeIn = np.flipud(crossFadeOut)
+
+    crossFadeOut.flags.writeable = False
+    crossFadeIn.flags.writeable = False
+
+    return crossFadeIn, crossFadeOut
+
+
+@njit(parallel=True, fastmath=True, cache=True)
+def convolve_accumulate(tf_blocked, fdl, head, out):
+    """
+    Multiply the filter blocks of all channels with their FDL ring buffers and accumulate
+    over blocks and channels. Frequency bins are processed in parallel chunks.
+
+    :param tf_blocked: Filters [nChannels, ear, IR_blocks, blockSize+1]
+    :param fdl: FDL ring buffers [nChannels, IR_blocks, blockSize+1]; filter block k belongs to FDL block head + k
+    :param head: Current head of the FDL ring buffers
+    :param out: Result [ear, blockSize+1], accumulated in place
+    :return: None
+    """
+    n_channels, n_ears, n_blocks, n_bins = tf_blocked.shape
+    chunk_size = 64
+    n_chunks = (n_bins + chunk_size - 1) // chunk_size
+
+    for chunk in prange(n_chunks):
+        start = chunk * chunk_size
+        stop = min(start + chunk_size, n_bins)
+        for ear in range(n_ears):
+            for n in range(n_channels):
+                for k in range(n_blocks):
+                    fdl_block = (head + k) % n_blocks
+                    for j in range(start, stop):
+                        out[ear, j] += tf_blocked[n, ear, k, j] * fdl[n, fdl_block, j]
+
+
+@njit(fastmath=True, cache=True)
+def crossfade(output, difference, window):
+    """
+    Fade from the old to the new output block in a single pass: output += (old - new) * window
+    crossFadeIn + crossFadeOut == 1, so new * crossFadeIn + old * crossFadeOut == new + (old - new) * crossFadeOut
+
+    :param output: Output of the new filters [ear, blockSize], written in place
+    :param difference: Output of (old filters - new filters) [ear, blockSize]
+    :param window: Fade out window of the old filters
+    :return: None
+    """
+    for ear in range(output.shape[0]):
+        for i in range(output.shape[1]):
+            output[ear, i] += difference[ear, i] * window[i]
+
 
 class ConvolverFFTW(object):
     """
@@ -46,6 +152,7 @@ class ConvolverFFTW(object):
         self.log.info("Convolver: Start Init")
 
         # pyFFTW Options
+        use_wisdom()
         pyfftw.interfaces.cache.enable()
         # self.fftw_planning_effort='FFTW_MEASURE'
         self.fftw_planning_effort = 'FFTW_PATIENT'
@@ -63,87 +170,74 @@ class ConvolverFFTW(object):
         #self.crossFadeIn *= 1 / float((self.block_size - 1))
         #self.crossFadeOut = np.flipud(self.crossFadeIn)
 
-        # Calculate COSINE-Square crossfade windows
-        self.crossFadeOut = np.array(range(0, self.block_size), dtype='float32')
-        self.crossFadeOut = np.square(
-            np.cos(self.crossFadeOut/(self.block_size-1)*(np.pi/2)))
-        self.crossFadeIn = np.flipud(self.crossFadeOut)
+        # COSINE-Square crossfade windows
+        self.crossFadeIn, self.crossFadeOut = _crossfade_windows(self.block_size)
 
         # Filter format: [nBlocks,blockSize*2]
 
-        pn_temporary = Path(__file__).parent.parent / "tmp"
-        fn_wisdom = pn_temporary / "fftw_wisdom.pickle"
-        if pn_temporary.exists() and fn_wisdom.exists():
-            loaded_wisdom = pickle.load(open(fn_wisdom, 'rb'))
-            pyfftw.import_wisdom(loaded_wisdom)
-
         # Create Input Buffers and create fftw plans. These need to be memory aligned, because they are ransformed to
         # freq domain regularly
         self.log.info("Convolver: Start Init buffer fft plans")
+        # The buffers are shifted in place, so the forward transforms must not overwrite their input
         self.buffer = pyfftw.zeros_aligned(self.block_size * 2, dtype='float32')
-        self.bufferFftPlan = pyfftw.builders.rfft(self.buffer, overwrite_input=True, threads=nThreads,
+        self.bufferFftPlan = pyfftw.builders.rfft(self.buffer, overwrite_input=False, threads=nThreads,
                                                   planner_effort=self.fftw_planning_effort, avoid_copy=True)
 
         self.buffer2 = pyfftw.zeros_aligned(
             self.block_size * 2, dtype='float32')
-        self.buffer2FftPlan = pyfftw.builders.rfft(self.buffer2, overwrite_input=True, threads=nThreads,
+        self.buffer2FftPlan = pyfftw.builders.rfft(self.buffer2, overwrite_input=False, threads=nThreads,
                                                    planner_effort=self.fftw_planning_effort, avoid_copy=True)
 
-        # Create arrays for the filters and the FDLs.
-        self.log.info("Convolver: Start Init filter fft plans")
-        self.TF_left_blocked = np.zeros(
-            (self.IR_blocks, self.block_size + 1), dtype='complex64')
-        self.TF_right_blocked = np.zeros(
-            (self.IR_blocks, self.block_size + 1), dtype='complex64')
-        self.TF_left_blocked_previous = np.zeros(
-            (self.IR_blocks, self.block_size + 1), dtype='complex64')
-        self.TF_right_blocked_previous = np.zeros(
-            (self.IR_blocks, self.block_size + 1), dtype='complex64')
-
-        self.filter_fftw_plan = pyfftw.builders.rfft(np.zeros(self.block_size, dtype=np.float32), n=self.block_size * 2, overwrite_input=True,
-                                                     threads=nThreads, planner_effort=self.fftw_planning_effort,
-                                                     avoid_copy=False)
-
-        self.FDL_size = self.IR_blocks * (self.block_size + 1)
-        self.FDL_left = np.zeros(self.FDL_size, dtype='complex64')
-        self.FDL_right = np.zeros(self.FDL_size, dtype='complex64')
-
-        # Arrays for the result of the complex multiply and add
+        # Views of the previous and the current block in the input buffers
+        self.bufferPrevious = self.buffer[:self.block_size]
+        self.bufferCurrent = self.buffer[self.block_size:]
+        self.buffer2Previous = self.buffer2[:self.block_size]
+        self.buffer2Current = self.buffer2[self.block_size:]
+
+        # Create arrays for the filters and the FDLs. Format: [ear (left, right), IR_blocks, blockSize+1]
+        self.log.info("Convolver: Start Init filter arrays")
+        self.TF_blocked = np.zeros(
+            (2, self.IR_blocks, self.block_size + 1), dtype='complex64')
+        self.TF_blocked_previous = np.zeros(
+            (2, self.IR_blocks, self.block_size + 1), dtype='complex64')
+
+        # FDLs are ring buffers of spectra: fdl_head points to the newest block, older blocks follow (modulo IR_blocks)
+        self.FDL = np.zeros((2, self.IR_blocks, self.block_size + 1), dtype='complex64')
+        self.fdl_head = 0
+
+        # Mono input feeds both ears, so only the first FDL is used and broadcast
+        self.FDL_ears = self.FDL if process_stereo else self.FDL[:1]
+
+        # Scratch arrays for the complex products of all IR blocks and for filter differences
+        self.productFreq = np.zeros((2, self.IR_blocks, self.block_size + 1), dtype='complex64')
+        self.filterDifference = np.zeros((2, self.IR_blocks, self.block_size + 1), dtype='complex64')
+
+        # Arrays for the result of the complex multiply and add, one row per ear (left, right)
         # These should be memory aligned because ifft is performed with these data
-        self.resultLeftFreq = pyfftw.zeros_aligned(
-            self.block_size + 1, dtype='complex64')
-        self.resultRightFreq = pyfftw.zeros_aligned(
-            self.block_size + 1, dtype='complex64')
-        self.resultLeftFreqPrevious = pyfftw.zeros_aligned(
-            self.block_size + 1, dtype='complex64')
-        self.resultRightFreqPrevious = pyfftw.zeros_aligned(
-            self.block_size + 1, dtype='complex64')
+        self.resultFreq = pyfftw.zeros_aligned(
+            (2, self.block_size + 1), dtype='complex64')
+        # Convolution of the input with (previous filter - current filter), only needed for interpolation
+        self.resultFreqDifference = pyfftw.zeros_aligned(
+            (2, self.block_size + 1), dtype='complex64')
 
         self.log.info("Convolver: Start Init result ifft plans")
-        self.resultLeftIFFTPlan = pyfftw.builders.irfft(self.resultLeftFreq,
-                                                        overwrite_input=True, threads=nThreads,
-                                                        planner_effort=self.fftw_planning_effort, avoid_copy=True)
-        self.resultRightIFFTPlan = pyfftw.builders.irfft(self.resultRightFreq,
-                                                         overwrite_input=True, threads=nThreads,
-                                                         planner_effort=self.fftw_planning_effort, avoid_copy=True)
-
-        self.log.info("Convolver: Start Init result prvieous fft plans")
-        self.resultLeftPreviousIFFTPlan = pyfftw.builders.irfft(self.resultLeftFreqPrevious,
-                                                                overwrite_input=True, threads=nThreads,
-                                                                planner_effort=self.fftw_planning_effort, avoid_copy=True)
-        self.resultRightPreviousIFFTPlan = pyfftw.builders.irfft(self.resultRightFreqPrevious,
-                                                                 overwrite_input=True, threads=nThreads,
-                                                                 planner_effort=self.fftw_planning_effort, avoid_copy=True)
-
-        # save FFTW plans to recover for next pyBinSim session
-        collected_wisdom = pyfftw.export_wisdom()
-        if not pn_temporary.exists():
-            pn_temporary.mkdir(parents=True)
-        pickle.dump(collected_wisdom, open(fn_wisdom, "wb"))
-
-        # Result of the ifft is stored here
-        self.outputLeft = np.zeros(self.block_size, dtype='float32')
-        self.outputRight = np.zeros(self.block_size, dtype='float32')
+        self.resultIFFTPlan = pyfftw.builders.irfft(self.resultFreq,
+                                                    overwrite_input=True, threads=nThreads,
+                                                    planner_effort=self.fftw_planning_effort, avoid_copy=True)
+        self.resultDifferenceIFFTPlan = pyfftw.builders.irfft(self.resultFreqDifference,
+                                                              overwrite_input=True, threads=nThreads,
+                                                              planner_effort=self.fftw_planning_effort, avoid_copy=True)
+
+        # Result of the ifft is stored in the output arrays of the plans; the views are created once here
+        # and returned by every process() call, so they have to be consumed before the next call
+        self.output = self.resultIFFTPlan.output_array[:, self.block_size:]
+        self.outputLeft = self.output[0]
+        self.outputRight = self.output[1]
+        self.outputDifference = self.resultDifferenceIFFTPlan.output_array[:, self.block_size:]
+
+        # Compile the crossfade kernel now instead of in the first interpolated block;
+        # both outputs are overwritten by the ifft in every process() call
+        crossfade(self.output, self.outputDifference, self.crossFadeOut)
 
         # Counts how often process() is called
         self.processCounter = 0
@@ -165,28 +259,6 @@ class ConvolverFFTW(object):
         """
         return self.processCounter
 
-    def transform_filter(self, filter):
-        """
-        Transform filter to freq domain
-
-        :param filter:
-        :return: transformed filter
-        """
-
-        # Get blocked IRs
-        IR_left_blocked, IR_right_blocked = filter.getFilter()
-
-        self.TF_left_blocked = np.zeros(
-            [self.IR_blocks, self.block_size + 1], dtype='complex64')
-        self.TF_right_blocked = np.zeros(
-            [self.IR_blocks, self.block_size + 1], dtype='complex64')
-
-        for ir_block_count in range(0, self.IR_blocks):
-            self.TF_left_blocked[ir_block_count] = self.filter_fftw_plan(
-                IR_left_blocked[ir_block_count])
-            self.TF_right_blocked[ir_block_count] = self.filter_fftw_plan(
-                IR_right_blocked[ir_block_count])
-
     def setIR(self, filter, do_interpolation):
         """
         Hand over a new set of filters to the convolver
@@ -197,11 +269,10 @@ class ConvolverFFTW(object):
         :return: None
         """
         # Save old filters in case interpolation is needed
-        self.TF_left_blocked_previous = self.TF_left_blocked
-        self.TF_right_blocked_previous = self.TF_right_blocked
+        self.TF_blocked_previous = self.TF_blocked
 
-        # apply new filters
-        self.transform_filter(filter)
+        # apply new filters; they are already transformed to freq domain
+        self.TF_blocked = filter.getSpectra()
 
         # Interpolation means cross fading the output blocks (linear interpolation)
         self.interpolate = do_interpolation
@@ -213,84 +284,48 @@ class ConvolverFFTW(object):
         """
         self.processCounter += 1
 
+    def advance_fdl(self):
+        """
+        Advance the FDL ring buffers by one block; the oldest block is overwritten next.
+        :return: None
+        """
+        self.fdl_head = (self.fdl_head - 1) % self.IR_blocks
+
     def fill_buffer_mono(self, block):
         """
         Copy mono soundblock to input Buffer;
         Transform to Freq. Domain and store result in FDLs
-        :param block: Mono sound block
+        :param block: Mono sound block of exactly block_size samples
         :return: None
         """
 
-        if block.size < self.block_size:
-            # print('Fill up last block')
-            block = np.concatenate(
-                (block, np.zeros((1, (self.block_size - block.size)), dtype=np.float32)), 1)
-
-        if self.processCounter == 0:
-            # insert first block to buffer
-            self.buffer[self.block_size:] = block
+        # shift buffer in place and insert new block
+        self.bufferPrevious[...] = self.bufferCurrent
+        self.bufferCurrent[...] = block
+        self.advance_fdl()
 
-        else:
-            # shift buffer
-            self.buffer = np.roll(self.buffer, -self.block_size)
-            # insert new block to buffer
-            self.buffer[self.block_size:self.block_size * 2] = block
-            # shift FDLs
-            self.FDL_left = np.roll(self.FDL_left, self.block_size + 1)
-            self.FDL_right = np.roll(self.FDL_right, self.block_size + 1)
-
-            # transform buffer into freq domain and copy to FDLs
-        self.FDL_left[:self.block_size + 1] = self.FDL_right[:self.block_size + 1] = self.bufferFftPlan(
-            self.buffer)
+        # transform buffer into freq domain and copy to FDLs
+        self.FDL[0, self.fdl_head] = self.bufferFftPlan(self.buffer)
 
     def fill_buffer_stereo(self, block):
         """
         Copy stereo soundblock to input Buffer1 and Buffer2;
         Transform to Freq. Domain and store result in FDLs
 
-        :param block:
+        :param block: Stereo sound block [block_size, 2]
         :return: None
         """
 
-        if block.size < self.block_size:
-            # print('Fill up last block')
-            # print(np.shape(block))
-            block = np.concatenate(
-                (block, np.zeros(((self.block_size - block.size), 2), dtype=np.float32)), 0)
-
-        if self.processCounter == 0:
-            # insert first block to buffer
-            self.buffer[self.block_size:] = block[:, 0]
-            self.buffer2[self.block_size:] = block[:, 1]
-
-        else:
-            # shift buffer
-            self.buffer = np.roll(self.buffer, -self.block_size)
-            self.buffer2 = np.roll(self.buffer2, -self.block_size)
-            # insert new block to buffer
-            self.buffer[self.block_size:] = block[:, 0]
-            self.buffer2[self.block_size:] = block[:, 1]
-            # shift FDLs
-            self.FDL_left = np.roll(self.FDL_left, self.block_size + 1)
-            self.FDL_right = np.roll(self.FDL_right, self.block_size + 1)
+        # shift buffers in place and insert new block
+        self.bufferPrevious[...] = self.bufferCurrent
+        self.buffer2Previous[...] = self.buffer2Current
+        self.bufferCurrent[...] = block[:, 0]
+        self.buffer2Current[...] = block[:, 1]
+        self.advance_fdl()
 
         # transform buffer into freq domain and copy to FDLs
-        self.FDL_left[0:self.block_size + 1] = self.bufferFftPlan(self.buffer)
-        self.FDL_right[0:self.block_size +
-                       1] = self.buffer2FftPlan(self.buffer2)
-
-    def multiply_and_add(self, IR_block_count, result, input1, input2):
-
-        # Discard old data on the beginning of a new sound block
-        if IR_block_count == 0:
-            result = np.multiply(input1[IR_block_count], input2[(
-                IR_block_count * (self.block_size + 1)):((IR_block_count + 1) * (self.block_size + 1))])
-
-        else:
-            result = np.add(np.multiply(input1[IR_block_count], input2[(
-                IR_block_count * (self.block_size + 1)):((IR_block_count + 1) * (self.block_size + 1))]), result)
-
-        return result
+        self.FDL[0, self.fdl_head] = self.bufferFftPlan(self.buffer)
+        self.FDL[1, self.fdl_head] = self.buffer2FftPlan(self.buffer2)
 
     def process(self, block):
         """
@@ -308,37 +343,31 @@ class ConvolverFFTW(object):
             # print('Convolver Stereo Processing')
             self.fill_buffer_stereo(block)
 
-        # Second: Multiplikation with IR block und accumulation with previous data
-        for irBlockCount in range(0, self.IR_blocks):
-            # Always convolute current filter
-            self.resultLeftFreq[:] = self.multiply_and_add(irBlockCount, self.resultLeftFreq,
-                                                           self.TF_left_blocked, self.FDL_left)
-            self.resultRightFreq[:] = self.multiply_and_add(irBlockCount, self.resultRightFreq,
-                                                            self.TF_right_blocked, self.FDL_right)
-
-            # Also convolute old filter if interpolation needed
-            if self.interpolate:
-                self.resultLeftFreqPrevious[:] = self.multiply_and_add(irBlockCount, self.resultLeftFreqPrevious,
-                                                                       self.TF_left_blocked_previous, self.FDL_left)
-                self.resultRightFreqPrevious[:] = self.multiply_and_add(irBlockCount, self.resultRightFreqPrevious,
-                                                                        self.TF_right_blocked_previous, self.FDL_right)
-
-        # Third: Transformation back to time domain
-        self.outputLeft = self.resultLeftIFFTPlan(self.resultLeftFreq)[
-            self.block_size:self.block_size * 2]
-        self.outputRight = self.resultRightIFFTPlan(self.resultRightFreq)[
-            self.block_size:self.block_size * 2]
+        # Second: Multiplikation with IR blocks und accumulation, both ears at once
+        # The FDL ring buffer is split at its head, so both parts are contiguous views
+        head = self.fdl_head
+        split = self.IR_blocks - head
+
+        # Always convolute current filter
+        np.multiply(self.TF_blocked[:, :split], self.FDL_ears[:, head:], out=self.productFreq[:, :split])
+        np.multiply(self.TF_blocked[:, split:], self.FDL_ears[:, :head], out=self.productFreq[:, split:])
+        np.sum(self.productFreq, axis=1, out=self.resultFreq)
+
+        # For interpolation only the difference to the old filter has to be convoluted
+        if self.interpolate:
+            np.subtract(self.TF_blocked_previous, self.TF_blocked, out=self.filterDifference)
+            np.multiply(self.filterDifference[:, :split], self.FDL_ears[:, head:], out=self.productFreq[:, :split])
+            np.multiply(self.filterDifference[:, split:], self.FDL_ears[:, :head], out=self.productFreq[:, split:])
+            np.sum(self.productFreq, axis=1, out=self.resultFreqDifference)
+
+        # Third: Transformation of both ears back to time domain (into self.output)
+        self.resultIFFTPlan()
 
         if self.interpolate:
             # fade over full block size
             # print('do block interpolation')
-            self.outputLeft = np.add(np.multiply(self.outputLeft, self.crossFadeIn),
-                                     np.multiply(self.resultLeftPreviousIFFTPlan(self.resultLeftFreqPrevious)[
-                                         self.block_size:self.block_size * 2], self.crossFadeOut))
-
-            self.outputRight = np.add(np.multiply(self.outputRight, self.crossFadeIn),
-                                      np.multiply(self.resultRightPreviousIFFTPlan(self.resultRightFreqPrevious)[
-                                          self.block_size:self.block_size * 2], self.crossFadeOut))
+            self.resultDifferenceIFFTPlan()
+            crossfade(self.output, self.outputDifference, self.crossFadeOut)
 
         self.processCounter += 1
         self.interpolate = False
@@ -348,3 +377,359 @@ class ConvolverFFTW(object):
     def close(self):
         print("Convolver: close")
         # TODO: do something here?
+
+
+class MultiConvolver(object):
+    """
+    State shared by the convolvers of several mono inputs: filters, FDL ring buffers and crossfade flags.
+    Subclasses allocate their transforms and implement process() for their device.
+    """
+
+    def __init__(self, ir_size, block_size, n_channels, xp):
+        """
+        :param ir_size: Filter length in samples
+        :param block_size: Block size in samples
+        :param n_channels: Number of mono inputs
+        :param xp: Array module holding filters and FDLs (numpy or cupy)
+        """
+        # Get Basic infos
+        self.IR_size = ir_size
+        self.block_size = block_size
+        self.n_channels = n_channels
+        self.IR_blocks = self.IR_size // block_size
+
+        # COSINE-Square crossfade windows, shared by all convolvers with the same block size
+        self.crossFadeIn, self.crossFadeOut = _crossfade_windows(self.block_size)
+
+        # Filters [nChannels, ear (left, right), IR_blocks, blockSize+1]
+        self.TF_blocked = xp.zeros(
+            (self.n_channels, 2, self.IR_blocks, self.block_size + 1), dtype='complex64')
+        self.TF_blocked_previous = xp.zeros(
+            (self.n_channels, 2, self.IR_blocks, self.block_size + 1), dtype='complex64')
+
+        # Input is mono, so left and right ear share one FDL ring buffer per channel
+        self.FDL = xp.zeros((self.n_channels, self.IR_blocks, self.block_size + 1), dtype='complex64')
+        self.fdl_head = 0
+
+        # Scratch array for filter differences of one channel
+        self.filterDifference = xp.zeros((1, 2, self.IR_blocks, self.block_size + 1), dtype='complex64')
+
+        # Counts how often process() is called
+        self.processCounter = 0
+
+        # Flags for interpolation of output blocks, one per channel (kept on the host)
+        self.interpolate = np.zeros(self.n_channels, dtype=bool)
+
+    def get_counter(self):
+        """
+        Returns processing counter
+        :return: processing counter
+        """
+        return self.processCounter
+
+    def setIR(self, channel, filter, do_interpolation):
+        """
+        Hand over a new set of filters for one channel
+        and define if you want to perform an interpolation/crossfade
+
+        :param channel:
+        :param filter:
+        :param do_interpolation:
+        :return: None
+        """
+        # Save old filters in case interpolation is needed
+        if do_interpolation:
+            self.TF_blocked_previous[channel] = self.TF_blocked[channel]
+
+        # apply new filters; they are already transformed to freq domain
+        self.set_spectra(channel, filter.getSpectra())
+
+        # Interpolation means cross fading the output blocks (linear interpolation)
+        self.interpolate[channel] = do_interpolation
+
+    def set_spectra(self, channel, spectra):
+        """
+        Copy the filter spectra of one channel into TF_blocked
+
+        :param channel:
+        :param spectra: Filter spectra [ear (left, right), IR_blocks, blockSize+1] on the host
+        :return: None
+        """
+        self.TF_blocked[channel] = spectra
+
+    def advance_fdl(self):
+        """
+        Advance the FDL ring buffers by one block; the oldest block is overwritten next.
+        :return: None
+        """
+        self.fdl_head = (self.fdl_head - 1) % self.IR_blocks
+
+    def process(self, block):
+        """
+        Main function
+
+        :param block: Sound blocks [nChannels, blockSize]
+        :return: (outputLeft, outputRight) summed over all channels
+        """
+        raise NotImplementedError
+
+    def close(self):
+        print("{}: close".format(type(self).__name__))
+
+
+class MultiConvolverFFTW(MultiConvolver):
+    """
+    Class for convolving several mono inputs (usually virtual sources) with their BRIRs or HRTFs at once.
+    All channels are transformed with one batched FFT and the results of all channels are summed up.
+    """
+
+    def __init__(self, ir_size, block_size, n_channels):
+        start = default_timer()
+
+        self.log = logging.getLogger("pybinsim.MultiConvolverFFTW")
+        self.log.info("MultiConvolver: Start Init")
+
+        self.log.info("MultiConvolver: Start Init filter arrays")
+        super().__init__(ir_size, block_size, n_channels, np)
+
+        # pyFFTW Options
+        use_wisdom()
+        pyfftw.interfaces.cache.enable()
+        self.fftw_planning_effort = 'FFTW_PATIENT'
+
+        # One input buffer row per channel; all rows are transformed with a single batched plan
+        self.log.info("MultiConvolver: Start Init buffer fft plans")
+        # The buffer is shifted in place, so the forward transform must not overwrite its input
+        self.buffer = pyfftw.zeros_aligned((self.n_channels, self.block_size * 2), dtype='float32')
+        self.bufferFftPlan = pyfftw.builders.rfft(self.buffer, axis=1, overwrite_input=False, threads=nThreads,
+                                                  planner_effort=self.fftw_planning_effort, avoid_copy=True)
+
+        # Views of the previous and the current blocks in the input buffer
+        self.bufferPrevious = self.buffer[:, :self.block_size]
+        self.bufferCurrent = self.buffer[:, self.block_size:]
+
+        # Arrays for the summed result of all channels, one row per ear (left, right)
+        self.resultFreq = pyfftw.zeros_aligned(
+            (2, self.block_size + 1), dtype='complex64')
+        # Convolution of the inputs with (previous filter - current filter), only needed for interpolation
+        self.resultFreqDifference = pyfftw.zeros_aligned(
+            (2, self.block_size + 1), dtype='complex64')
+
+        # Compile the multiply-accumulate kernel now instead of in the first audio callback
+        convolve_accumulate(self.TF_blocked, self.FDL, self.fdl_head, np.zeros_like(self.resultFreq))
+
+        self.log.info("MultiConvolver: Start Init result ifft plans")
+        self.resultIFFTPlan = pyfftw.builders.irfft(self.resultFreq,
+                                                    overwrite_input=True, threads=nThreads,
+                                                    planner_effort=self.fftw_planning_effort, avoid_copy=True)
+        self.resultDifferenceIFFTPlan = pyfftw.builders.irfft(self.resultFreqDifference,
+                                                              overwrite_input=True, threads=nThreads,
+                                                              planner_effort=self.fftw_planning_effort, avoid_copy=True)
+
+        # Result of the ifft is stored in the output arrays of the plans; the views are created once here
+        # and returned by every process() call, so they have to be consumed before the next call
+        self.output = self.resultIFFTPlan.output_array[:, self.block_size:]
+        self.outputLeft = self.output[0]
+        self.outputRight = self.output[1]
+        self.outputDifference = self.resultDifferenceIFFTPlan.output_array[:, self.block_size:]
+
+        # Compile the crossfade kernel now instead of in the first interpolated block;
+        # both outputs are overwritten by the ifft in every process() call
+        crossfade(self.output, self.outputDifference, self.crossFadeOut)
+
+        end = default_timer()
+        delta = end - start
+        self.log.info(f"MultiConvolver: Finished Init (took {delta}s)")
+
+    def fill_buffer(self, block):
+        """
+        Copy soundblocks of all channels to the input buffer;
+        Transform to Freq. Domain and store result in FDLs
+        :param block: Sound blocks [nChannels, blockSize]
+        :return: None
+        """
+
+        # shift buffer in place and insert new blocks
+        self.bufferPrevious[...] = self.bufferCurrent
+        self.bufferCurrent[...] = block
+        self.advance_fdl()
+
+        # transform all channels at once and copy to FDLs
+        self.FDL[:, self.fdl_head] = self.bufferFftPlan(self.buffer)
+
+    def add_filter_difference(self, channel):
+        """
+        Add the convolution of one channel with its previous filter minus its current filter
+        to resultFreqDifference (both ears)
+
+        :param channel:
+        :return: None
+        """
+        np.subtract(self.TF_blocked_previous[channel], self.TF_blocked[channel], out=self.filterDifference[0])
+        convolve_accumulate(self.filterDifference, self.FDL[channel:channel + 1], self.fdl_head,
+                            self.resultFreqDifference)
+
+    def process(self, block):
+        """
+        Main function
+
+        :param block: Sound blocks [nChannels, blockSize]
+        :return: (outputLeft, outputRight) summed over all channels
+        """
+
+        # First: Fill buffer and FDLs with current blocks
+        self.fill_buffer(block)
+
+        # Second: Multiplikation with IR blocks und accumulation over blocks and channels, both ears at once
+        self.resultFreq[:] = 0
+        convolve_accumulate(self.TF_blocked, self.FDL, self.fdl_head, self.resultFreq)
+
+        # For interpolation only the difference to the old filters has to be convoluted,
+        # and only for the channels which got a new filter
+        interpolate = self.interpolate.any()
+        if interpolate:
+            self.resultFreqDifference[:] = 0
+            for channel in np.flatnonzero(self.interpolate):
+                self.add_filter_difference(channel)
+
+        # Third: Transformation of both ears back to time domain (into self.output)
+        self.resultIFFTPlan()
+
+        if interpolate:
+            # fade over full block size
+            self.resultDifferenceIFFTPlan()
+            crossfade(self.output, self.outputDifference, self.crossFadeOut)
+
+        self.processCounter += 1
+        self.interpolate[:] = False
+
+        return self.outputLeft, self.outputRight
+
+
+class MultiConvolverCuFFT(MultiConvolver):
+    """
+    Same as MultiConvolverFFTW, but filters, FDLs and the multiply-accumulate live on a CUDA device.
+    Needs cupy; only the current input blocks and the two output signals are transferred per block.
+    """
+
+    def __init__(self, ir_size, block_size, n_channels):
+        start = default_timer()
+
+        self.log = logging.getLogger("pybinsim.MultiConvolverCuFFT")
+        self.log.info("MultiConvolverCuFFT: Start Init")
+
+        # cupy is an optional dependency and only needed when device 'cuda' is selected
+        import cupy
+        import cupyx
+        self.cp = cupy
+
+        super().__init__(ir_size, block_size, n_channels, cupy)
+        self.crossFadeOut_gpu = cupy.asarray(self.crossFadeOut)
+
+        # All device buffers are allocated here; process() works in place on them
+        self.stream = cupy.cuda.Stream(non_blocking=True)
+        self.input = cupy.zeros((self.n_channels, self.block_size), dtype='float32')
+        self.buffer = cupy.zeros((self.n_channels, self.block_size * 2), dtype='float32')
+        self.spectrum = cupy.zeros((self.n_channels, self.block_size + 1), dtype='complex64')
+
+        # Products of filters and FDLs before they are summed up
+        self.productFreq = cupy.zeros(
+            (self.n_channels, 2, self.IR_blocks, self.block_size + 1), dtype='complex64')
+        self.resultFreq = cupy.zeros((2, self.block_size + 1), dtype='complex64')
+        self.differenceFreq = cupy.zeros((2, self.block_size + 1), dtype='complex64')
+        self.channelDifferenceFreq = cupy.zeros((2, self.block_size + 1), dtype='complex64')
+        self.resultTime = cupy.zeros((2, self.block_size * 2), dtype='float32')
+        self.differenceTime = cupy.zeros((2, self.block_size * 2), dtype='float32')
+        self.result = cupy.zeros((2, self.block_size), dtype='float32')
+
+        # cuFFT plans which write into the buffers above; cupy.fft would allocate its output for every call.
+        # The inverse (C2R) transforms overwrite their input, which is recomputed for every block anyway
+        self.cufft = cupy.cuda.cufft
+        self.rfft_plan = self.cufft.Plan1d(self.block_size * 2, self.cufft.CUFFT_R2C, self.n_channels)
+        self.irfft_plan = self.cufft.Plan1d(self.block_size * 2, self.cufft.CUFFT_C2R, 2)
+
+        # Pinned host memory for the result, so the copy back to the host is a plain DMA transfer
+        self.output = cupyx.zeros_pinned((2, self.block_size), dtype='float32')
+        self.outputLeft = self.output[0]
+        self.outputRight = self.output[1]
+
+        end = default_timer()
+        delta = end - start
+        self.log.info(f"MultiConvolverCuFFT: Finished Init (took {delta}s)")
+
+    def setIR(self, channel, filter, do_interpolation):
+        # Filters are copied on the stream of process(), so they are in place before the next block
+        with self.stream:
+            super().setIR(channel, filter, do_interpolation)
+
+    def set_spectra(self, channel, spectra):
+        self.TF_blocked[channel].set(spectra, stream=self.stream)
+
+    def convolve(self, tf_blocked, fdl, out):
+        """
+        Multiply IR blocks with their FDL entries and sum up over channels and blocks.
+        The FDL ring buffer is split at its head, so no data has to be reordered
+
+        :param tf_blocked: Filter spectra [nChannels, 2, IR_blocks, blockSize+1]
+        :param fdl: FDL ring buffers [nChannels, IR_blocks, blockSize+1]
+        :param out: Spectra of both ears [2, blockSize+1]
+        :return: out
+        """
+        cp = self.cp
+        head = self.fdl_head
+        split = self.IR_blocks - head
+        product = self.productFreq[:tf_blocked.shape[0]]
+
+        cp.multiply(tf_blocked[:, :, :split], fdl[:, None, head:], out=product[:, :, :split])
+        if head > 0:
+            cp.multiply(tf_blocked[:, :, split:], fdl[:, None, :head], out=product[:, :, split:])
+
+        return cp.sum(product, axis=(0, 2), out=out)
+
+    def process(self, block):
+        """
+        Main function
+
+        :param block: Sound blocks [nChannels, blockSize]
+        :return: (outputLeft, outputRight) summed over all channels
+        """
+        cp = self.cp
+
+        with self.stream:
+            # First: Fill buffer and FDLs with current blocks
+            self.input.set(block, stream=self.stream)
+            self.buffer[:, :self.block_size] = self.buffer[:, self.block_size:]
+            self.buffer[:, self.block_size:] = self.input
+            self.advance_fdl()
+            self.rfft_plan.fft(self.buffer, self.spectrum, self.cufft.CUFFT_FORWARD)
+            self.FDL[:, self.fdl_head] = self.spectrum
+
+            # Second: Multiplikation with IR blocks und accumulation over blocks and channels
+            self.convolve(self.TF_blocked, self.FDL, self.resultFreq)
+            self.irfft_plan.fft(self.resultFreq, self.resultTime, self.cufft.CUFFT_INVERSE)
+
+            # For interpolation only the difference to the old filters of the updated channels is convoluted
+            # and faded out, as in the crossfade kernel
+            if self.interpolate.any():
+                self.differenceFreq[:] = 0
+                for channel in np.flatnonzero(self.interpolate):
+                    cp.subtract(self.TF_blocked_previous[channel], self.TF_blocked[channel],
+                                out=self.filterDifference[0])
+                    self.convolve(self.filterDifference, self.FDL[channel:channel + 1], self.channelDifferenceFreq)
+                    self.differenceFreq += self.channelDifferenceFreq
+                self.irfft_plan.fft(self.differenceFreq, self.differenceTime, self.cufft.CUFFT_INVERSE)
+                self.differenceTime[:, self.block_size:] *= self.crossFadeOut_gpu
+                self.resultTime[:, self.block_size:] += self.differenceTime[:, self.block_size:]
+
+            # cuFFT does not scale the inverse transform
+            cp.multiply(self.resultTime[:, self.block_size:], 1.0 / (self.block_size * 2), out=self.result)
+
+            # Third: copy both ears back to the host
+            self.result.get(stream=self.stream, out=self.output)
+
+        self.stream.synchronize()
+
+        self.processCounter += 1
+        self.interpolate[:] = False
+
+        return self.outputLeft, self.outputRight
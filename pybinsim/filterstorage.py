@@ -24,8 +24,10 @@ import logging
 import multiprocessing
 
 import numpy as np
+import pyfftw
 import soundfile as sf
 
+from pybinsim.convolver import use_wisdom
 from pybinsim.pose import Pose
 from pybinsim.utility import total_size
 
@@ -34,16 +36,23 @@ nThreads = multiprocessing.cpu_count()
 
 class Filter(object):
 
-    def __init__(self, inputfilter, irBlocks, block_size, filename=None):
+    def __init__(self, inputfilter, irBlocks, block_size, filename=None, fft_plan=None):
 
-        self.IR_left_blocked = np.reshape(
-            inputfilter[:, 0], (irBlocks, block_size))
-        self.IR_right_blocked = np.reshape(
-            inputfilter[:, 1], (irBlocks, block_size))
         self.filename = filename
 
-    def getFilter(self):
-        return self.IR_left_blocked, self.IR_right_blocked
+        # Blocked IRs of both ears [ear (left, right), irBlocks, block_size]
+        # Only the spectra are kept; the time domain IRs are not needed for the convolution
+        ir_blocked = np.reshape(np.ascontiguousarray(inputfilter.T), (2, irBlocks, block_size))
+
+        # Spectra of the zero padded IR blocks [ear (left, right), irBlocks, block_size+1]
+        # They are computed once here with a single transform, so switching filters during playback needs no FFT
+        if fft_plan is None:
+            self.TF_blocked = np.fft.rfft(ir_blocked, n=block_size * 2, axis=-1).astype('complex64')
+        else:
+            self.TF_blocked = np.copy(fft_plan(ir_blocked))
+
+    def getSpectra(self):
+        return self.TF_blocked
 
 
 class FilterStorage(object):
@@ -57,8 +66,17 @@ class FilterStorage(object):
         self.ir_size = irSize
         self.ir_blocks = irSize // block_size
         self.block_size = block_size
+
+        # Batched plan which transforms all blocks of both ears of one IR at once.
+        # The input is zero padded once; only the first half of each block is overwritten per filter
+        use_wisdom()
+        self.filter_fft_input = pyfftw.zeros_aligned((2, self.ir_blocks, self.block_size * 2), dtype='float32')
+        self.filter_fftw_plan = pyfftw.builders.rfft(self.filter_fft_input, axis=-1, threads=nThreads,
+                                                     planner_effort='FFTW_MEASURE', avoid_copy=True)
+
         self.default_filter = Filter(
-            np.zeros((self.ir_size, 2), dtype='float32'), self.ir_blocks, self.block_size)
+            np.zeros((self.ir_size, 2), dtype='float32'), self.ir_blocks, self.block_size,
+            fft_plan=self.transform_filter)
 
         self.filter_list_path = filter_list_name
         self.filter_list = open(self.filter_list_path, 'r')
@@ -71,6 +89,16 @@ class FilterStorage(object):
         # Start to load filters
         self.load_filters()
 
+    def transform_filter(self, ir_blocked):
+        """
+        Transform zero padded IR blocks of both ears to freq domain
+
+        :param ir_blocked: IR blocks [2, ir_blocks, block_size]
+        :return: Spectra [2, ir_blocks, block_size+1]; overwritten by the next call
+        """
+        self.filter_fft_input[:, :, :self.block_size] = ir_blocked
+        return self.filter_fftw_plan()
+
     def parse_filter_list(self):
         """
         Generator for filter list lines
@@ -98,7 +126,7 @@ class FilterStorage(object):
                 self.log.info(
                     "Loading headphone filter: {}".format(filter_path))
                 self.headphone_filter = Filter(self.load_filter(
-                    filter_path), self.ir_blocks, self.block_size)
+                    filter_path), self.ir_blocks, self.block_size, fft_plan=self.transform_filter)
                 continue
 
             filter_value_list = tuple(line_content[0:-1])
@@ -121,7 +149,8 @@ class FilterStorage(object):
 
             loaded_filter = self.load_filter(filter_path)
             current_filter = Filter(
-                loaded_filter, self.ir_blocks, self.block_size, filename=filter_path)
+                loaded_filter, self.ir_blocks, self.block_size, filename=filter_path,
+                fft_plan=self.transform_filter)
 
             # create key and store in dict.
             key = pose.create_key()
@@ -139,11 +168,20 @@ class FilterStorage(object):
         :return: corresponding filter for pose
         """
 
-        key = pose.create_key()
+        return self.get_filter_by_key(pose.create_key())
+
+    def get_filter_by_key(self, key):
+        """
+        Same as get_filter, but takes a key created by Pose.create_key, e.g. precomputed by the OscReceiver
+
+        :param key
+        :return: corresponding filter for key
+        """
+
+        result_filter = self.filter_dict.get(key)
 
-        if key in self.filter_dict:
+        if result_filter is not None:
             self.log.info(f'Filter found: key: {key}')
-            result_filter = self.filter_dict.get(key)
             if result_filter.filename is not None:
                 self.log.info(f'   use file:: {result_filter.filename}')
             return result_filter
@@ -163,17 +201,17 @@ class FilterStorage(object):
 
     def load_filter(self, filter_path):
 
-        current_filter, fs = sf.read(filter_path, dtype='float32')
+        with sf.SoundFile(filter_path) as filter_file:
+            # The zero padded filter is allocated once and the file is read directly into it
+            current_filter = np.zeros((self.ir_size, filter_file.channels), dtype=np.float32)
 
-        filter_size = np.shape(current_filter)
+            # Fill filter with zeros if to short
+            if filter_file.frames < self.ir_size:
+                self.log.warning('Filter too short: Fill up with zeros')
+            if filter_file.frames > self.ir_size:
+                self.log.warning('Filter too long: shorten')
 
-        # Fill filter with zeros if to short
-        if filter_size[0] < self.ir_size:
-            self.log.warning('Filter too short: Fill up with zeros')
-            current_filter = np.concatenate((current_filter, np.zeros(
-                (self.ir_size - filter_size[0], 2), np.float32)), 0)
-        if filter_size[0] > self.ir_size:
-            self.log.warning('Filter too long: shorten')
-            current_filter = current_filter[:self.ir_size]
+            filter_file.read(out=current_filter[:min(filter_file.frames, self.ir_size)])
 
-        return current_filter
+        # Only the first two channels are used (left, right)
+        return current_filter[:, :2]
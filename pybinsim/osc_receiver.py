@@ -21,46 +21,63 @@
 # SOFTWARE.
 
 import logging
+import queue
 import threading
 
 from pythonosc import dispatcher
 from pythonosc import osc_server
 
+from pybinsim.pose import Pose
+
 
 class OscReceiver(object):
     """
     Class for receiving OSC Messages to control pyBinSim
     """
 
-    def __init__(self):
+    def __init__(self, port=10000):
+        """
+        :param port: UDP port to listen on; 0 binds any free port
+        """
 
         self.log = logging.getLogger("pybinsim.OscReceiver")
         self.log.info("oscReceiver: init")
 
         # Basic settings
         self.ip = '127.0.0.1'
-        self.port = 10000
+        self.port = port
         self.maxChannels = 100
 
-        # Default values; Stores filter keys for all channles/convolvers
-        self.filters_updated = [True] * self.maxChannels
+        # Filter updates are handed to the audio thread without locks: the OSC thread first stores the
+        # new values and then increments the update counter of the channel; the audio thread remembers the
+        # last counter it has seen. Counters start different so the default filters are applied once.
+        self.filter_update_counter = [1] * self.maxChannels
+        self.filter_update_seen = [0] * self.maxChannels
 
+        # Default values; Stores filter keys for all channles/convolvers
         self.defaultValue = (0, 0, 0, 0, 0, 0, 0, 0, 0)
         self.valueList = [self.defaultValue] * self.maxChannels
+        # Filter keys are created here when a message arrives, not in the audio callback
+        self.keyList = [Pose.from_filterValueList(self.defaultValue).create_key()] * self.maxChannels
         # self.valueList = [()] * self.maxChannels
         self.soundFileList = ''
         self.soundFileNew = False
-        self.soundevent = False
-        self.soundevent_data = []
+        # Sound event commands are handed to the audio thread one by one
+        self.soundevents = queue.Queue()
 
         osc_dispatcher = dispatcher.Dispatcher()
         osc_dispatcher.map("/pyBinSim", self.handle_filter_input)
         osc_dispatcher.map("/pyBinSimFile", self.handle_file_input)
         osc_dispatcher.map("/pyBinSimSoundevent", self.handle_soundevent)
 
-        self.server = osc_server.ThreadingOSCUDPServer(
+        # Messages are handled one after another in the osc thread. This avoids starting a thread per message
+        # and keeps the osc thread the only writer of the update counters
+        self.server = osc_server.BlockingOSCUDPServer(
             (self.ip, self.port), osc_dispatcher)
 
+        # Set by the osc thread once it starts serving on the bound socket
+        self.ready = threading.Event()
+
     def handle_filter_input(self, identifier, channel, *args):
         """
         Handler for tracking information
@@ -86,8 +103,15 @@ class OscReceiver(object):
 
         if args != self.valueList[current_channel]:
             #self.log.info("new filter")
-            self.filters_updated[current_channel] = True
+            try:
+                key = Pose.from_filterValueList(args).create_key()
+            except RuntimeError as e:
+                self.log.warning(e)
+                return
+
             self.valueList[current_channel] = tuple(args)
+            self.keyList[current_channel] = key
+            self.filter_update_counter[current_channel] += 1
         else:
             self.log.info("same filter as before")
 
@@ -119,41 +143,40 @@ class OscReceiver(object):
         assert identifier == "/pyBinSimSoundevent"
 
         self.log.info("soundevent: {}".format(args))
-        for data in args:
-            self.soundevent_data.append(data)
-
-        self.soundevent = True
+        self.soundevents.put(args)
 
     def new_soundevent_triggered(self):
         """ Check if there is a new sound_event """
-        return self.soundevent
+        return not self.soundevents.empty()
 
     def get_soundevent_data(self):
-        """Get soundevent command and reset flag""" 
-        self.soundevent = False
-
-        tx_soundevent_data = self.soundevent_data
-        self.soundevent_data = []
-
-        return tx_soundevent_data
+        """Get the oldest soundevent command"""
+        return self.soundevents.get_nowait()
 
     def start_listening(self):
         """Start osc receiver in background Thread"""
 
         self.log.info("Serving on {}".format(self.server.server_address))
 
-        osc_thread = threading.Thread(target=self.server.serve_forever)
+        osc_thread = threading.Thread(target=self.serve, name="pybinsim osc")
         osc_thread.daemon = True
         osc_thread.start()
 
+    def serve(self):
+        """Signal readiness and handle requests until close() is called"""
+        self.ready.set()
+        self.server.serve_forever()
+
     def is_filter_update_necessary(self, channel):
         """ Check if there is a new filter for channel """
-        return self.filters_updated[channel]
-
-    def get_current_values(self, channel):
-        """ Return key for filter """
-        self.filters_updated[channel] = False
-        return self.valueList[channel]
+        return self.filter_update_counter[channel] != self.filter_update_seen[channel]
+
+    def get_current_key(self, channel):
+        """ Return precomputed filter key for FilterStorage.get_filter_by_key """
+        # Mark the counter as seen before reading the key; an update arriving in between
+        # changes the counter again and is picked up with the next block
+        self.filter_update_seen[channel] = self.filter_update_counter[channel]
+        return self.keyList[channel]
 
     def get_sound_file_list(self):
         ret_list = self.soundFileList
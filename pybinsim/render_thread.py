@@ -0,0 +1,109 @@
+# This file is part of the pyBinSim project.
+#
+# Copyright (c) 2017 A. Neidhardt, F. Klein, N. Knoop, T. Köllmer
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+import logging
+import threading
+
+import numpy as np
+
+
+class RenderThread(object):
+    """
+    Renders stereo output blocks ahead of playback into a ring of preallocated slots,
+    so jitter in the convolution does not directly hit the deadline of the audio device.
+
+    There is exactly one writer (the render thread) and one reader (the audio callback). Each of the
+    two block counters is only changed by one of them, so no locks are needed to hand over slots.
+    """
+
+    def __init__(self, render, block_size, n_slots):
+        """
+        :param render: Function rendering the next block; returns a [blockSize, 2] float32 array
+        :param block_size: Block size in samples
+        :param n_slots: Number of blocks rendered ahead
+        """
+        self.log = logging.getLogger("pybinsim.RenderThread")
+
+        self.render = render
+        self.n_slots = n_slots
+        self.slots = np.zeros((n_slots, block_size, 2), dtype=np.float32)
+
+        # Counters of rendered and played blocks
+        self.written = 0
+        self.read = 0
+
+        # Set by the reader whenever a slot was freed
+        self.slot_free = threading.Event()
+
+        # Exception which stopped the render thread, if any
+        self.error = None
+
+        self.running = False
+        self.thread = threading.Thread(target=self.run, name="pybinsim render")
+        self.thread.daemon = True
+
+    def start(self):
+        self.running = True
+        self.thread.start()
+
+    def run(self):
+        while self.running:
+            if self.written - self.read >= self.n_slots:
+                # All slots are filled; wait until the reader frees one
+                self.slot_free.clear()
+                if self.written - self.read >= self.n_slots:
+                    self.slot_free.wait(timeout=0.1)
+                continue
+
+            try:
+                self.slots[self.written % self.n_slots] = self.render()
+            except Exception as e:
+                # Without this the thread would end silently and every following callback would underrun
+                self.log.exception("Rendering failed, render thread stopped")
+                self.error = e
+                self.running = False
+                break
+            self.written += 1
+
+    def read_block(self, frame_count):
+        """
+        Return the oldest rendered block as bytes
+
+        :param frame_count: Number of frames requested by the audio device
+        :return: Block data or None if no block is ready (underrun or, if error is set, failed rendering)
+        """
+        if self.read == self.written:
+            return None
+
+        # Copy before the slot is handed back to the render thread
+        data = self.slots[self.read % self.n_slots, :frame_count].tobytes()
+        self.read += 1
+        self.slot_free.set()
+
+        return data
+
+    def close(self):
+        self.running = False
+        self.slot_free.set()
+        if self.thread.is_alive():
+            self.thread.join()
@@ -21,14 +21,16 @@
 # SOFTWARE.
 
 import logging
-import threading
-import time
 import re
 
 import numpy as np
 import soundfile as sf
 
 
+# Sound file names contain a three digit id and the event type, e.g. 001lID_music.wav
+_ID_RE = re.compile(r"(?P<id>[0-9]{3})(?P<type>[slt])ID_")
+
+
 class AudioBuffer(object):
     """ Class to handle the audio buffer and serve it to pyBinSim """
 
@@ -38,25 +40,19 @@ class AudioBuffer(object):
 
         self.n_channels = n_channels
         self.chunk_size = block_size
-        self.bufferSize = block_size * 2
-        self.buffer = np.zeros([self.n_channels, self.bufferSize])
         self.active_channels = n_channels
 
-    def buffer_add_silence(self):
-        self.buffer[:self.active_channels, :-self.chunk_size] = self.buffer[:self.active_channels, self.chunk_size:]
-        self.buffer[:self.active_channels, -self.chunk_size:] = np.zeros([self.active_channels, self.chunk_size])
-
-    def buffer_add_sound(self, new_chunk):
-        self.buffer[:self.active_channels, :-self.chunk_size] = self.buffer[:self.active_channels, self.chunk_size:]
-        self.buffer[:self.active_channels, -self.chunk_size:] = new_chunk
+    def buffer_read(self, new_chunk):
+        """
+        Serve the current chunk of the sound scene
 
-    def buffer_flush(self):
-        self.buffer = np.zeros([self.n_channels, self.bufferSize])
+        No copy is made: the returned array is a view of new_chunk. SoundSceneHandler reuses its scene array,
+        so the result has to be consumed (pyBinSim copies it into its input block) before the next chunk is requested.
 
-    def buffer_read(self, new_chunk):
-        buffer_content = self.buffer[:self.active_channels, :-self.chunk_size]
-        self.buffer_add_sound(new_chunk)
-        return buffer_content
+        :param new_chunk: Full chunk of the sound scene [n_channels, chunk_size]
+        :return: View of the active channels [active_channels, chunk_size]
+        """
+        return new_chunk[:self.active_channels]
 
     def get_sound_channels(self):
         return self.active_channels
@@ -73,33 +69,40 @@ class SoundSceneHandler(object):
         self.n_channels = n_channels
         self.chunk_size = block_size
         self.sound_events = dict()
-        self.scene = np.zeros([n_channels, block_size])
-        self.scene_chunk = np.zeros([n_channels, block_size])
+        self.scene = np.zeros([n_channels, block_size], dtype=np.float32)
+        self.scene_silent = True
+        # Only running sound events are asked for chunks
+        self.active_events = []
         self.sound_file = np.zeros((0, 0))
         self.soundPath = ''
-        self.soundFileList = []
+        self.soundFileList = ()
 
     def request_chunk(self):
+        """
+        Sum up the next chunks of all running sound events
 
-        # for sound in self.sound_events.values():
-        #     if sound.is_running:
-        #         chunk = sound.request_chunk()
-        #         # Old:
-        #         # self.scene[sound.channel:sound.channel+sound.n_channels, :] = chunk
-
-        #         # New: now more additions are needed, but this is more conveniant for a multiprocessing approach
-        #         # Now the channelordering is done in sound_event
-        #         self.scene += chunk
-        chunks = list(map(lambda x:x.request_chunk(), list(self.sound_events.values())))
-        self.scene = sum(chunks)        
-        
-        self.scene_chunk = self.scene
-        self.scene_flush()
-        
-        return self.scene_chunk
+        :return: Scene [n_channels, chunk_size]; the array is reused with the next call
+        """
+        if not self.scene_silent:
+            self.scene_flush()
+
+        ended = False
+        for sound in self.active_events:
+            chunk = sound.request_chunk()
+            if chunk is None:
+                ended = True
+                continue
+            self.scene[sound.channel:sound.channel + sound.n_channels] += chunk
+
+        if ended:
+            self.active_events = [sound for sound in self.active_events if sound.is_running]
+
+        self.scene_silent = not self.active_events
+
+        return self.scene
 
     def scene_flush(self):
-        self.scene = np.zeros([self.n_channels, self.chunk_size])
+        self.scene[:] = 0
 
     def control_sound_event(self, event_data):
         """Interface to sound event objects"""
@@ -111,65 +114,83 @@ class SoundSceneHandler(object):
         else:
             add_info = None
 
+        sound = self.sound_events[key]
         if command == 'pause':
-            self.sound_events[key].pause_sound()
+            sound.pause_sound()
+            self.deactivate(sound)
         elif command == 'stop':
-            self.sound_events[key].stop_sound()
+            sound.stop_sound()
+            self.deactivate(sound)
         elif command == 'start':
-            self.sound_events[key].start_sound(add_info)
+            sound.start_sound(add_info)
+            if sound not in self.active_events:
+                self.active_events.append(sound)
         elif command == 'sendto':
-            self.sound_events[key].place_sound(add_info)
+            sound.place_sound(add_info)
         else:  
             raise ValueError('Unknown soundevent command!')
+
+    def deactivate(self, sound):
+        if sound in self.active_events:
+            self.active_events.remove(sound)
     
     def read_sound_files(self, sound_file_list):
         """load all files for the audio installation"""
-        sound_file_list = str.split(sound_file_list, '#')
-        self.soundFileList = sound_file_list
+        self.soundFileList = tuple(sound_file_list.split('#'))
         self.log.info("Audio Files: {}".format(str(self.soundFileList)))
 
         for sound in self.soundFileList:
             self.log.info('Loading new sound file')
 
             #get id and type of soundfile
-            match = re.search(r"(?P<id>[0-9]{3})(?P<type>[slt])ID_", sound)
+            match = _ID_RE.search(sound)
             key = match.group('id')
             event_type = match.group('type')
 
-            audio_file_data, fs = sf.read(sound, dtype='float32', )
-            assert fs == self.fs
-
-            self.log.debug("audio_file_data: {} MB".format(audio_file_data.nbytes // 1024 // 1024))
-            self.sound_file = np.asmatrix(audio_file_data)
-
-            # free data
-            audio_file_data = None
-
-            if self.sound_file.shape[0] > self.sound_file.shape[1]:
-                self.sound_file = self.sound_file.transpose()
-
+            self.sound_file = self.read_sound_file(sound)
             self.active_channels = self.sound_file.shape[0]
 
-            if self.sound_file.shape[1] % self.chunk_size != 0:
-                length_diff = self.chunk_size - (self.sound_file.shape[1] % self.chunk_size)
-                zeros = np.zeros((self.sound_file.shape[0], length_diff), dtype=np.float32)
-
-                self.log.debug("Zeros size: {} Byte".format(zeros.nbytes))
-                self.log.debug("Zeros shape: {} ({})".format(zeros.shape, zeros.dtype))
-                self.log.debug("Soundfile size: {} MiB".format(self.sound_file.nbytes // 1024 // 1024))
-                self.log.debug("Soundfile shape: {} ({})".format(self.sound_file.shape, self.sound_file.dtype))
-                self.sound_file = np.concatenate(
-                    (self.sound_file, zeros),
-                    1
-                )
-                self.log.debug("Soundfile size after concat: {} MiB".format(self.sound_file.nbytes // 1024 // 1024))
-                self.log.debug(
-                    "Soundfile shape after concat: {} ({})".format(self.sound_file.shape, self.sound_file.dtype))
-
             #collect SoundEvent in dictionary
             self.sound_events[key] = SoundEvent(self.sound_file, key, event_type, self.chunk_size, self.n_channels)
+            if self.sound_events[key].is_running:
+                self.active_events.append(self.sound_events[key])
             self.log.info('Loaded new sound file\n')
 
+    def read_sound_file(self, sound):
+        """
+        Read a sound file block by block into a channel first array, zero padded to full chunks
+
+        :param sound: Path of the sound file
+        :return: Sound [channels, frames]
+        """
+        with sf.SoundFile(sound) as sound_file:
+            assert sound_file.samplerate == self.fs
+
+            n_frames = -(-sound_file.frames // self.chunk_size) * self.chunk_size
+            sound_data = np.zeros((sound_file.channels, n_frames), dtype=np.float32)
+            self.log.debug("Soundfile size: {} MiB".format(sound_data.nbytes // 1024 // 1024))
+
+            # 16 bit files are read natively and scaled while copying, which halves the read data
+            if sound_file.subtype == 'PCM_16':
+                read_dtype = np.int16
+                scale = np.float32(1.0 / 32768.0)
+            else:
+                read_dtype = np.float32
+                scale = np.float32(1.0)
+
+            # Blocks are read into a small frame first scratch array and copied to their place;
+            # this avoids a transposed copy of the whole file
+            read_block = np.empty((self.chunk_size * 1024, sound_file.channels), dtype=read_dtype)
+            position = 0
+            while position < sound_file.frames:
+                frames = sound_file.read(out=read_block).shape[0]
+                if frames == 0:
+                    break
+                np.multiply(read_block[:frames].T, scale, out=sound_data[:, position:position + frames])
+                position += frames
+
+        return sound_data
+
 
 class SoundEvent(object):
     """Storing sounds as events and interfacing with storage"""
@@ -183,7 +204,6 @@ class SoundEvent(object):
         
         self.max_channels = max_channels
         self.chunk_size = chunk_size
-        self.chunk = np.zeros([max_channels, chunk_size])
 
         if type == 'l':
             self.loopSound = True
@@ -195,6 +215,9 @@ class SoundEvent(object):
         self.sound = sound
         self.n_channels = sound.shape[0]
         self.frame_count = 0
+        # sounds are padded to full chunks; the views of all chunks are created once here
+        self._blocks = [sound[:, i:i + chunk_size] for i in range(0, sound.shape[1], chunk_size)]
+        self._n_frames = len(self._blocks)
 
     def start_sound(self, channel=None):
         if channel:
@@ -213,21 +236,24 @@ class SoundEvent(object):
         return
 
     def request_chunk(self):
-
-        if (self.frame_count + 1) * self.chunk_size < self.sound.shape[1] and self.is_running:
-            self.chunk[self.channel:self.channel+self.n_channels] = self.sound[:, self.frame_count * self.chunk_size: (self.frame_count + 1) * self.chunk_size]
-            self.frame_count += 1
-        elif self.loopSound and self.is_running:
-            self.chunk[self.channel:self.channel+self.n_channels] = self.sound[:, 0: self.chunk_size]
+        """
+        Next chunk of a running sound
+
+        :return: View into the sound [n_channels, chunk_size] or None when the sound has ended
+        """
+        frame_count = self.frame_count
+        if frame_count < self._n_frames:
+            self.frame_count = frame_count + 1
+            return self._blocks[frame_count]
+
+        # end of the sound
+        if self.loopSound:
             self.frame_count = 1
-        elif self.is_running:
-            self.chunk = np.zeros([self.max_channels, self.chunk_size])
-            self.frame_count = 0
-            self.is_running = False
-        else:
-            self.chunk = np.zeros([self.max_channels, self.chunk_size])
+            return self._blocks[0]
 
-        return self.chunk
+        self.frame_count = 0
+        self.is_running = False
+        return None
 
     def place_sound(self, channel):
         self.channel = channel
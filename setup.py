@@ -33,6 +33,7 @@ setup(
     install_requires=[
         "future == 0.16.0",
         "numpy == 1.12.1",
+        "numba == 0.35.0",
         "ovr == 1.10.101",
         "pyaudio == 0.2.10",
         "pyfftw == 0.10.4",
@@ -0,0 +1,4 @@
+import pybinsim.convolver
+
+# Test runs must not write FFTW wisdom into the source tree
+pybinsim.convolver.fn_wisdom = None
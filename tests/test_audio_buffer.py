@@ -0,0 +1,19 @@
+from unittest import TestCase
+
+import numpy as np
+
+from pybinsim.soundhandling import AudioBuffer
+
+
+class TestAudioBuffer(TestCase):
+    def test_chunks_are_served_without_delay(self):
+        audio_buffer = AudioBuffer(4, 2)
+
+        np.testing.assert_array_equal(audio_buffer.buffer_read(np.full((2, 4), 1.0)), np.full((2, 4), 1.0))
+        np.testing.assert_array_equal(audio_buffer.buffer_read(np.full((2, 4), 2.0)), np.full((2, 4), 2.0))
+
+    def test_chunk_is_served_as_view(self):
+        audio_buffer = AudioBuffer(4, 2)
+        chunk = np.full((2, 4), 1.0, dtype=np.float32)
+
+        self.assertTrue(np.shares_memory(audio_buffer.buffer_read(chunk), chunk))
@@ -1,6 +1,8 @@
+import os
+import tempfile
 from unittest import TestCase
 
-from pybinsim.application import parse_boolean
+from pybinsim.application import BinSimConfig, parse_boolean
 
 
 class TestBinSimConfig(TestCase):
@@ -12,3 +14,21 @@ class TestBinSimConfig(TestCase):
             output = parse_boolean(test_value)
             self.assertEqual(output, expected_outputs[i], "i={}".format(i))
 
+    def test_read_from_file(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.cfg', delete=False) as config_file:
+            config_file.write("blockSize 512\n"
+                              "enableCrossfading True\n"
+                              "loudnessFactor 0.5\n"
+                              "filterList brirs/list.txt\n")
+
+        try:
+            config = BinSimConfig()
+            config.read_from_file(config_file.name)
+        finally:
+            os.remove(config_file.name)
+
+        self.assertEqual(config.get('blockSize'), 512)
+        self.assertIs(config.get('enableCrossfading'), True)
+        self.assertEqual(config.get('loudnessFactor'), 0.5)
+        self.assertEqual(config.get('filterList'), 'brirs/list.txt')
+        self.assertEqual(config.get('maxChannels'), 8)
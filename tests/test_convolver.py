@@ -0,0 +1,173 @@
+from unittest import TestCase, skipUnless
+
+import numpy as np
+
+from pybinsim.convolver import ConvolverFFTW, MultiConvolverCuFFT, MultiConvolverFFTW
+from pybinsim.filterstorage import Filter
+
+
+def cuda_available():
+    try:
+        import cupy
+        return cupy.cuda.runtime.getDeviceCount() > 0
+    except Exception:
+        return False
+
+
+class TestConvolverFFTW(TestCase):
+    ir_size = 512
+    block_size = 64
+
+    def setUp(self):
+        rng = np.random.RandomState(0)
+        self.ir = rng.standard_normal((self.ir_size, 2)).astype(np.float32)
+        self.signal = rng.standard_normal(self.block_size * 12).astype(np.float32)
+
+    def test_mono_matches_direct_convolution(self):
+        convolver = ConvolverFFTW(self.ir_size, self.block_size, False)
+        convolver.setIR(Filter(self.ir, self.ir_size // self.block_size, self.block_size), False)
+
+        left = []
+        right = []
+        for block in np.split(self.signal, self.signal.size // self.block_size):
+            out_left, out_right = convolver.process(block)
+            left.append(np.copy(out_left))
+            right.append(np.copy(out_right))
+
+        expected_left = np.convolve(self.signal, self.ir[:, 0])[:self.signal.size]
+        expected_right = np.convolve(self.signal, self.ir[:, 1])[:self.signal.size]
+
+        np.testing.assert_allclose(np.concatenate(left), expected_left, atol=1e-3)
+        np.testing.assert_allclose(np.concatenate(right), expected_right, atol=1e-3)
+
+    def test_stereo_matches_direct_convolution(self):
+        convolver = ConvolverFFTW(self.ir_size, self.block_size, True)
+        convolver.setIR(Filter(self.ir, self.ir_size // self.block_size, self.block_size), False)
+
+        stereo_signal = np.stack([self.signal, self.signal[::-1]], axis=1)
+
+        left = []
+        right = []
+        for block in np.split(stereo_signal, self.signal.size // self.block_size):
+            out_left, out_right = convolver.process(block)
+            left.append(np.copy(out_left))
+            right.append(np.copy(out_right))
+
+        expected_left = np.convolve(stereo_signal[:, 0], self.ir[:, 0])[:self.signal.size]
+        expected_right = np.convolve(stereo_signal[:, 1], self.ir[:, 1])[:self.signal.size]
+
+        np.testing.assert_allclose(np.concatenate(left), expected_left, atol=1e-3)
+        np.testing.assert_allclose(np.concatenate(right), expected_right, atol=1e-3)
+
+    def test_crossfade_between_filters(self):
+        new_ir = np.random.RandomState(2).standard_normal((self.ir_size, 2)).astype(np.float32)
+        switch_block = 6
+
+        convolver = ConvolverFFTW(self.ir_size, self.block_size, False)
+        convolver.setIR(Filter(self.ir, self.ir_size // self.block_size, self.block_size), False)
+
+        output = []
+        for n, block in enumerate(np.split(self.signal, self.signal.size // self.block_size)):
+            if n == switch_block:
+                convolver.setIR(Filter(new_ir, self.ir_size // self.block_size, self.block_size), True)
+            output.append(np.stack([np.copy(out) for out in convolver.process(block)]))
+        output = np.concatenate(output, axis=1)
+
+        old = np.stack([np.convolve(self.signal, self.ir[:, ear])[:self.signal.size] for ear in range(2)])
+        new = np.stack([np.convolve(self.signal, new_ir[:, ear])[:self.signal.size] for ear in range(2)])
+        fade = slice(switch_block * self.block_size, (switch_block + 1) * self.block_size)
+
+        np.testing.assert_allclose(output[:, :fade.start], old[:, :fade.start], atol=1e-3)
+        np.testing.assert_allclose(output[:, fade],
+                                   new[:, fade] * convolver.crossFadeIn + old[:, fade] * convolver.crossFadeOut,
+                                   atol=1e-3)
+        np.testing.assert_allclose(output[:, fade.stop:], new[:, fade.stop:], atol=1e-3)
+
+
+class TestMultiConvolverFFTW(TestCase):
+    ir_size = 512
+    block_size = 64
+    n_channels = 3
+
+    def test_matches_sum_of_direct_convolutions(self):
+        rng = np.random.RandomState(1)
+        irs = rng.standard_normal((self.n_channels, self.ir_size, 2)).astype(np.float32)
+        signals = rng.standard_normal((self.n_channels, self.block_size * 12)).astype(np.float32)
+
+        convolver = MultiConvolverFFTW(self.ir_size, self.block_size, self.n_channels)
+        for channel in range(self.n_channels):
+            convolver.setIR(channel, Filter(irs[channel], self.ir_size // self.block_size, self.block_size), False)
+
+        left = []
+        right = []
+        for block in np.split(signals, signals.shape[1] // self.block_size, axis=1):
+            out_left, out_right = convolver.process(block)
+            left.append(np.copy(out_left))
+            right.append(np.copy(out_right))
+
+        expected_left = sum(np.convolve(signals[n], irs[n, :, 0])[:signals.shape[1]] for n in range(self.n_channels))
+        expected_right = sum(np.convolve(signals[n], irs[n, :, 1])[:signals.shape[1]] for n in range(self.n_channels))
+
+        np.testing.assert_allclose(np.concatenate(left), expected_left, atol=1e-3)
+        np.testing.assert_allclose(np.concatenate(right), expected_right, atol=1e-3)
+
+    def test_crossfade_between_filters(self):
+        rng = np.random.RandomState(3)
+        irs = rng.standard_normal((self.n_channels, self.ir_size, 2)).astype(np.float32)
+        new_ir = rng.standard_normal((self.ir_size, 2)).astype(np.float32)
+        signals = rng.standard_normal((self.n_channels, self.block_size * 12)).astype(np.float32)
+        n_samples = signals.shape[1]
+        switch_block = 6
+        switch_channel = 1
+
+        convolver = MultiConvolverFFTW(self.ir_size, self.block_size, self.n_channels)
+        for channel in range(self.n_channels):
+            convolver.setIR(channel, Filter(irs[channel], self.ir_size // self.block_size, self.block_size), False)
+
+        output = []
+        for n, block in enumerate(np.split(signals, n_samples // self.block_size, axis=1)):
+            if n == switch_block:
+                convolver.setIR(switch_channel, Filter(new_ir, self.ir_size // self.block_size, self.block_size), True)
+            output.append(np.stack([np.copy(out) for out in convolver.process(block)]))
+        output = np.concatenate(output, axis=1)
+
+        def convolve(signal, ir):
+            return np.stack([np.convolve(signal, ir[:, ear])[:n_samples] for ear in range(2)])
+
+        others = sum(convolve(signals[n], irs[n]) for n in range(self.n_channels) if n != switch_channel)
+        old = others + convolve(signals[switch_channel], irs[switch_channel])
+        new = others + convolve(signals[switch_channel], new_ir)
+        fade = slice(switch_block * self.block_size, (switch_block + 1) * self.block_size)
+
+        np.testing.assert_allclose(output[:, :fade.start], old[:, :fade.start], atol=1e-3)
+        np.testing.assert_allclose(output[:, fade],
+                                   new[:, fade] * convolver.crossFadeIn + old[:, fade] * convolver.crossFadeOut,
+                                   atol=1e-3)
+        np.testing.assert_allclose(output[:, fade.stop:], new[:, fade.stop:], atol=1e-3)
+
+
+@skipUnless(cuda_available(), "cupy and a CUDA device are needed")
+class TestMultiConvolverCuFFT(TestCase):
+    ir_size = 1024
+    block_size = 128
+    n_channels = 3
+
+    def test_matches_multi_convolver_fftw(self):
+        rng = np.random.RandomState(4)
+        filters = [Filter(rng.standard_normal((self.ir_size, 2)).astype(np.float32),
+                          self.ir_size // self.block_size, self.block_size) for _ in range(5)]
+        blocks = rng.standard_normal((40, self.n_channels, self.block_size)).astype(np.float32)
+
+        reference = MultiConvolverFFTW(self.ir_size, self.block_size, self.n_channels)
+        convolver = MultiConvolverCuFFT(self.ir_size, self.block_size, self.n_channels)
+
+        for n, block in enumerate(blocks):
+            # switch filters of some channels, with and without crossfade
+            for channel in range(self.n_channels):
+                if (n + 2 * channel) % 5 == 0:
+                    interpolate = (n // 5 + channel) % 2 == 0
+                    reference.setIR(channel, filters[(n + channel) % 5], interpolate)
+                    convolver.setIR(channel, filters[(n + channel) % 5], interpolate)
+
+            expected = np.stack([np.copy(out) for out in reference.process(block)])
+            np.testing.assert_allclose(np.stack(convolver.process(block)), expected, atol=1e-3)
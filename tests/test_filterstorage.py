@@ -0,0 +1,60 @@
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+import numpy as np
+import soundfile as sf
+
+from pybinsim.filterstorage import FilterStorage
+from pybinsim.pose import Pose
+
+
+def reference_spectra(ir, ir_size, block_size):
+    """ Spectra of the zero padded IR blocks of the first two channels """
+    padded = np.zeros((ir_size, 2), dtype=np.float32)
+    frames = min(len(ir), ir_size)
+    padded[:frames] = ir[:frames, :2]
+    blocks = padded.T.reshape(2, ir_size // block_size, block_size)
+    return np.fft.rfft(blocks, n=2 * block_size, axis=-1)
+
+
+class TestFilterStorage(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.ir_size = 512
+        self.block_size = 128
+
+        random = np.random.RandomState(0)
+        self.irs = {
+            0: random.standard_normal((100, 4)).astype(np.float32) * 0.1,
+            10: random.standard_normal((600, 2)).astype(np.float32) * 0.1,
+        }
+
+        lines = []
+        for yaw, ir in self.irs.items():
+            filter_path = os.path.join(self.directory, 'ir{}.wav'.format(yaw))
+            sf.write(filter_path, ir, 44100, subtype='FLOAT')
+            lines.append('{} 0 0 0 0 0 {}\n'.format(yaw, filter_path))
+
+        hp_path = os.path.join(self.directory, 'hp.wav')
+        sf.write(hp_path, self.irs[0], 44100, subtype='FLOAT')
+        lines.append('HPFILTER {}\n'.format(hp_path))
+
+        self.filter_list = os.path.join(self.directory, 'filter_list.txt')
+        with open(self.filter_list, 'w') as filter_list:
+            filter_list.writelines(lines)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_filters_are_loaded_padded_and_transformed(self):
+        storage = FilterStorage(self.ir_size, self.block_size, self.filter_list)
+        storage.filter_list.close()
+
+        for yaw, ir in self.irs.items():
+            spectra = storage.get_filter(Pose.from_filterValueList((yaw, 0, 0, 0, 0, 0))).getSpectra()
+            np.testing.assert_allclose(spectra, reference_spectra(ir, self.ir_size, self.block_size), atol=1e-4)
+
+        np.testing.assert_allclose(storage.get_headphone_filter().getSpectra(),
+                                   reference_spectra(self.irs[0], self.ir_size, self.block_size), atol=1e-4)
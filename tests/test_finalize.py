@@ -0,0 +1,23 @@
+from unittest import TestCase
+
+import numpy as np
+
+from pybinsim.application import finalize, peak
+
+
+class TestFinalize(TestCase):
+    def test_scale_and_peak(self):
+        left = np.array([0.5, -2.0, 1.0], dtype=np.float32)
+        right = np.array([-1.5, 0.25, 3.0], dtype=np.float32)
+        result = np.zeros((3, 2), dtype=np.float32)
+
+        peak = finalize(result, left, right, 0.5)
+
+        np.testing.assert_allclose(result[:, 0], left * 0.5)
+        np.testing.assert_allclose(result[:, 1], right * 0.5)
+        self.assertAlmostEqual(peak, 1.5)
+
+    def test_peak(self):
+        result = np.array([[0.5, -2.5], [1.0, 0.0]], dtype=np.float32)
+
+        self.assertAlmostEqual(peak(result), 2.5)
@@ -8,7 +8,7 @@ class TestImports(TestCase):
         import pybinsim.convolver
         import pybinsim.filterstorage
         import pybinsim.osc_receiver
-        import pybinsim.soundhandler
+        import pybinsim.soundhandling
         import pybinsim.utility
 
 
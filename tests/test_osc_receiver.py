@@ -0,0 +1,84 @@
+from unittest import TestCase
+
+from pybinsim.osc_receiver import OscReceiver
+from pybinsim.pose import Pose
+
+
+def key_of(values):
+    return Pose.from_filterValueList(values).create_key()
+
+
+class TestFilterUpdates(TestCase):
+    def setUp(self):
+        self.receiver = OscReceiver(port=0)
+
+    def tearDown(self):
+        self.receiver.server.server_close()
+
+    def test_default_key_is_applied_once(self):
+        self.assertTrue(self.receiver.is_filter_update_necessary(0))
+        self.assertEqual(self.receiver.get_current_key(0), key_of(self.receiver.defaultValue))
+        self.assertFalse(self.receiver.is_filter_update_necessary(0))
+
+    def test_update_is_cleared_by_get_current_key(self):
+        self.receiver.get_current_key(0)
+        self.receiver.get_current_key(1)
+
+        self.receiver.handle_filter_input("/pyBinSim", 1, 10, 0, 0, 0, 0, 0, 0, 0, 0)
+        self.assertTrue(self.receiver.is_filter_update_necessary(1))
+        self.assertFalse(self.receiver.is_filter_update_necessary(0))
+        self.assertEqual(self.receiver.get_current_key(1), key_of((10, 0, 0, 0, 0, 0, 0, 0, 0)))
+        self.assertFalse(self.receiver.is_filter_update_necessary(1))
+
+    def test_same_values_are_no_update(self):
+        self.receiver.handle_filter_input("/pyBinSim", 0, 10, 0, 0, 0, 0, 0)
+        self.receiver.get_current_key(0)
+
+        self.receiver.handle_filter_input("/pyBinSim", 0, 10, 0, 0, 0, 0, 0)
+        self.assertFalse(self.receiver.is_filter_update_necessary(0))
+
+    def test_malformed_message_is_rejected(self):
+        self.receiver.get_current_key(0)
+
+        with self.assertLogs("pybinsim.OscReceiver", level="WARNING"):
+            self.receiver.handle_filter_input("/pyBinSim", 0, 10, 0, 0)
+
+        self.assertFalse(self.receiver.is_filter_update_necessary(0))
+        self.assertEqual(self.receiver.valueList[0], self.receiver.defaultValue)
+        self.assertEqual(self.receiver.get_current_key(0), key_of(self.receiver.defaultValue))
+
+    def test_update_while_key_is_read_is_picked_up_next_block(self):
+        receiver = self.receiver
+        receiver.get_current_key(0)
+        receiver.handle_filter_input("/pyBinSim", 0, 10, 0, 0, 0, 0, 0)
+
+        class KeyList(list):
+            # Lets the OSC thread store an update after the counter was marked as seen, before the key is read
+            def __getitem__(self, channel):
+                receiver.keyList = list(self)
+                receiver.handle_filter_input("/pyBinSim", 0, 20, 0, 0, 0, 0, 0)
+                return receiver.keyList[channel]
+
+        receiver.keyList = KeyList(receiver.keyList)
+        self.assertTrue(receiver.is_filter_update_necessary(0))
+        receiver.get_current_key(0)
+
+        self.assertTrue(receiver.is_filter_update_necessary(0))
+        self.assertEqual(receiver.get_current_key(0), key_of((20, 0, 0, 0, 0, 0)))
+        self.assertFalse(receiver.is_filter_update_necessary(0))
+
+    def test_update_between_check_and_read_is_applied(self):
+        self.receiver.get_current_key(0)
+        self.receiver.handle_filter_input("/pyBinSim", 0, 10, 0, 0, 0, 0, 0)
+
+        # audio thread: an update is pending ...
+        self.assertTrue(self.receiver.is_filter_update_necessary(0))
+        # ... the OSC thread stores a newer one before the key is read
+        self.receiver.handle_filter_input("/pyBinSim", 0, 20, 0, 0, 0, 0, 0)
+        self.assertEqual(self.receiver.get_current_key(0), key_of((20, 0, 0, 0, 0, 0)))
+        self.assertFalse(self.receiver.is_filter_update_necessary(0))
+
+        # a later update is applied with the next block
+        self.receiver.handle_filter_input("/pyBinSim", 0, 30, 0, 0, 0, 0, 0)
+        self.assertTrue(self.receiver.is_filter_update_necessary(0))
+        self.assertEqual(self.receiver.get_current_key(0), key_of((30, 0, 0, 0, 0, 0)))
@@ -0,0 +1,50 @@
+import time
+from unittest import TestCase
+
+import numpy as np
+
+from pybinsim.render_thread import RenderThread
+
+
+class TestRenderThread(TestCase):
+    def test_blocks_are_read_in_order(self):
+        block = np.zeros((4, 2), dtype=np.float32)
+        counter = [0]
+
+        def render():
+            counter[0] += 1
+            block[:] = counter[0]
+            return block
+
+        render_thread = RenderThread(render, 4, 2)
+        render_thread.start()
+
+        values = []
+        try:
+            while len(values) < 5:
+                data = render_thread.read_block(4)
+                if data is None:
+                    time.sleep(0.001)
+                    continue
+                values.append(np.frombuffer(data, dtype=np.float32)[0])
+        finally:
+            render_thread.close()
+
+        self.assertEqual(values, [1, 2, 3, 4, 5])
+
+    def test_underrun_returns_none(self):
+        render_thread = RenderThread(lambda: np.zeros((4, 2), dtype=np.float32), 4, 2)
+        self.assertIsNone(render_thread.read_block(4))
+
+    def test_render_error_stops_thread(self):
+        def render():
+            raise RuntimeError("render failed")
+
+        render_thread = RenderThread(render, 4, 2)
+        render_thread.start()
+        render_thread.thread.join(timeout=1)
+
+        self.assertFalse(render_thread.thread.is_alive())
+        self.assertIsInstance(render_thread.error, RuntimeError)
+        self.assertIsNone(render_thread.read_block(4))
+        render_thread.close()
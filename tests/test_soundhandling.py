@@ -0,0 +1,180 @@
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+import numpy as np
+import soundfile as sf
+
+from pybinsim.soundhandling import SoundEvent, SoundSceneHandler
+
+BLOCK_SIZE = 4
+N_CHANNELS = 4
+FS = 48000
+
+
+def make_sound(n_blocks, n_channels=1):
+    """ Sound whose samples count up, so every chunk can be identified """
+    return np.arange(n_channels * n_blocks * BLOCK_SIZE, dtype=np.float32).reshape(n_channels, -1) + 1
+
+
+def make_scene(**events):
+    scene = SoundSceneHandler(BLOCK_SIZE, N_CHANNELS, FS)
+    for key, (sound, event_type) in events.items():
+        scene.sound_events[key] = SoundEvent(sound, key, event_type, BLOCK_SIZE, N_CHANNELS)
+        if scene.sound_events[key].is_running:
+            scene.active_events.append(scene.sound_events[key])
+    return scene
+
+
+def chunk(sound, index):
+    return sound[:, index * BLOCK_SIZE:(index + 1) * BLOCK_SIZE]
+
+
+class TestSoundEvent(TestCase):
+    def test_loop_wraps_to_first_chunk(self):
+        sound = make_sound(3)
+        event = SoundEvent(sound, '001', 'l', BLOCK_SIZE, N_CHANNELS)
+
+        self.assertTrue(event.is_running)
+        for index in [0, 1, 2, 0, 1]:
+            np.testing.assert_array_equal(event.request_chunk(), chunk(sound, index))
+        self.assertTrue(event.is_running)
+
+    def test_one_shot_ends(self):
+        sound = make_sound(2)
+        event = SoundEvent(sound, '001', 's', BLOCK_SIZE, N_CHANNELS)
+
+        self.assertFalse(event.is_running)
+        event.start_sound()
+        np.testing.assert_array_equal(event.request_chunk(), chunk(sound, 0))
+        np.testing.assert_array_equal(event.request_chunk(), chunk(sound, 1))
+        self.assertIsNone(event.request_chunk())
+        self.assertFalse(event.is_running)
+        self.assertEqual(event.frame_count, 0)
+
+
+class TestSoundSceneHandler(TestCase):
+    def test_loop_is_summed_into_scene(self):
+        sound = make_sound(3)
+        scene = make_scene(**{'001': (sound, 'l')})
+
+        for index in [0, 1, 2, 0]:
+            expected = np.zeros((N_CHANNELS, BLOCK_SIZE), dtype=np.float32)
+            expected[0] = chunk(sound, index)
+            np.testing.assert_array_equal(scene.request_chunk(), expected)
+
+    def test_one_shot_is_removed_from_active_events(self):
+        sound = make_sound(2)
+        scene = make_scene(**{'001': (sound, 's')})
+
+        self.assertEqual(scene.active_events, [])
+        np.testing.assert_array_equal(scene.request_chunk(), 0)
+
+        scene.control_sound_event(['001', 'start'])
+        self.assertEqual(scene.active_events, [scene.sound_events['001']])
+        np.testing.assert_array_equal(scene.request_chunk()[0], chunk(sound, 0)[0])
+        np.testing.assert_array_equal(scene.request_chunk()[0], chunk(sound, 1)[0])
+
+        # the chunk after the end is silent and the event is not asked again
+        np.testing.assert_array_equal(scene.request_chunk(), 0)
+        self.assertEqual(scene.active_events, [])
+        self.assertTrue(scene.scene_silent)
+
+    def test_pause_and_start_resume_at_position(self):
+        sound = make_sound(4)
+        scene = make_scene(**{'001': (sound, 'l')})
+
+        np.testing.assert_array_equal(scene.request_chunk()[0], chunk(sound, 0)[0])
+
+        scene.control_sound_event(['001', 'pause'])
+        self.assertEqual(scene.active_events, [])
+        np.testing.assert_array_equal(scene.request_chunk(), 0)
+        np.testing.assert_array_equal(scene.request_chunk(), 0)
+
+        scene.control_sound_event(['001', 'start'])
+        self.assertEqual(scene.active_events, [scene.sound_events['001']])
+        np.testing.assert_array_equal(scene.request_chunk()[0], chunk(sound, 1)[0])
+
+        # starting a running sound does not add it twice
+        scene.control_sound_event(['001', 'start'])
+        self.assertEqual(len(scene.active_events), 1)
+
+    def test_stop_and_start_restart_from_beginning(self):
+        sound = make_sound(4)
+        scene = make_scene(**{'001': (sound, 'l')})
+
+        scene.request_chunk()
+        scene.request_chunk()
+        scene.control_sound_event(['001', 'stop'])
+        self.assertEqual(scene.active_events, [])
+
+        scene.control_sound_event(['001', 'start'])
+        np.testing.assert_array_equal(scene.request_chunk()[0], chunk(sound, 0)[0])
+
+    def test_sendto_places_sound_on_channel(self):
+        sound = make_sound(2, n_channels=2)
+        scene = make_scene(**{'001': (sound, 'l')})
+
+        scene.control_sound_event(['001', 'sendto', 2])
+        expected = np.zeros((N_CHANNELS, BLOCK_SIZE), dtype=np.float32)
+        expected[2:4] = chunk(sound, 0)
+        np.testing.assert_array_equal(scene.request_chunk(), expected)
+
+    def test_events_are_summed(self):
+        first = make_sound(2)
+        second = make_sound(3) * 10
+        scene = make_scene(**{'001': (first, 'l'), '002': (second, 'l')})
+
+        np.testing.assert_array_equal(scene.request_chunk()[0], chunk(first, 0)[0] + chunk(second, 0)[0])
+
+    def test_unknown_command_raises(self):
+        scene = make_scene(**{'001': (make_sound(1), 'l')})
+
+        with self.assertRaises(ValueError):
+            scene.control_sound_event(['001', 'rewind'])
+
+
+class TestReadSoundFiles(TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_files_are_loaded_as_events(self):
+        loop = np.linspace(-0.5, 0.5, 10, dtype=np.float32)
+        one_shot = np.full((6, 2), 0.25, dtype=np.float32)
+        loop_path = os.path.join(self.tmp_dir, '001lID_loop.wav')
+        one_shot_path = os.path.join(self.tmp_dir, '002sID_shot.wav')
+        sf.write(loop_path, loop, FS, subtype='FLOAT')
+        sf.write(one_shot_path, one_shot, FS, subtype='FLOAT')
+
+        scene = SoundSceneHandler(BLOCK_SIZE, N_CHANNELS, FS)
+        scene.read_sound_files(loop_path + '#' + one_shot_path)
+
+        self.assertEqual(sorted(scene.sound_events), ['001', '002'])
+        self.assertEqual(scene.active_events, [scene.sound_events['001']])
+
+        # sounds are channel first and zero padded to full chunks
+        expected_loop = np.zeros((1, 12), dtype=np.float32)
+        expected_loop[0, :10] = loop
+        np.testing.assert_array_equal(scene.sound_events['001'].sound, expected_loop)
+        self.assertEqual(scene.sound_events['002'].sound.shape, (2, 8))
+        np.testing.assert_array_equal(scene.sound_events['002'].sound[:, :6], one_shot.T)
+        np.testing.assert_array_equal(scene.sound_events['002'].sound[:, 6:], 0)
+
+    def test_pcm_16_file_longer_than_one_read_block(self):
+        scene = SoundSceneHandler(BLOCK_SIZE, N_CHANNELS, FS)
+        # more frames than one read block of chunk_size * 1024, and not a multiple of the chunk size
+        n_frames = BLOCK_SIZE * 1024 * 2 + 3
+        signal = np.random.RandomState(0).uniform(-1, 1, (n_frames, 2))
+        path = os.path.join(self.tmp_dir, '001lID_pcm16.wav')
+        sf.write(path, signal, FS, subtype='PCM_16')
+
+        sound = scene.read_sound_file(path)
+
+        expected = sf.read(path, dtype='float32', always_2d=True)[0].T
+        self.assertEqual(sound.shape, (2, -(-n_frames // BLOCK_SIZE) * BLOCK_SIZE))
+        np.testing.assert_array_equal(sound[:, :n_frames], expected)
+        np.testing.assert_array_equal(sound[:, n_frames:], 0)